@@ -1,11 +1,13 @@
 import sys
 from pathlib import Path
-from datetime import datetime
-from gurobipy import Model, GRB, quicksum, read
-import json
+from gurobipy import read
 import uuid
 import traceback
 
+# Repository root, independent of the working directory the solver is started in
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+from src.instance_format import read_problem_instance_records
+
 
 def parse_args_to_dict(argv):
     args_dict = {}
@@ -24,13 +26,6 @@ def parse_args_to_dict(argv):
     return args_dict
 
 
-# Helper function
-def read_problem_instance(instance_path):
-    with open(instance_path, "r") as file:
-        data = json.load(file)
-        return data[0]
-
-
 # Helper function
 def calculateObjectiveFunction(contacts):
     result = 0
@@ -74,15 +69,6 @@ try:
 
     config = args
 
-    # Read problem instance
-    print("Read problem instance")
-    problemInstance = read_problem_instance(instance_path_json)
-    satellitePasses = problemInstance["satellite_passes"]
-    serviceTargets = problemInstance["service_targets"]
-
-    V = list(range(len(satellitePasses)))
-    S = list(range(len(serviceTargets)))
-
     model = read(instance_path_mps)
 
     # Suppress all solver output
@@ -105,17 +91,23 @@ try:
     # Optimize the model
     model.optimize()
 
-    contacts = []
-    for i in V:
-        for j in S:
-            var = model.getVarByName(f"x_{i}_{j}")
-            if var is not None and var.X > 0.5:
-                contacts.append(
-                    {
-                        "satellitePass": satellitePasses[i],
-                        "serviceTarget": serviceTargets[j],
-                    }
-                )
+    # Chosen (pass, target) positions, the variables are named x_i_j
+    chosen = []
+    for var in model.getVars():
+        if var.VarName.startswith("x_") and var.X > 0.5:
+            _, i, j = var.VarName.split("_")
+            chosen.append((int(i), int(j)))
+    chosen.sort()
+
+    # Only the records of the chosen contacts are kept while reading the instance
+    print("Read problem instance")
+    satellitePasses, serviceTargets = read_problem_instance_records(
+        instance_path_json, {i for i, _ in chosen}, {j for _, j in chosen}
+    )
+    contacts = [
+        {"satellitePass": satellitePasses[i], "serviceTarget": serviceTargets[j]}
+        for i, j in chosen
+    ]
 
     # Compute objectives
     if len(contacts) > 0:
@@ -3,9 +3,12 @@ from pathlib import Path
 import re
 import uuid
 from pyscipopt import Model
-import json
 import traceback
 
+# Repository root, independent of the working directory the solver is started in
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+from src.instance_format import read_problem_instance_records
+
 
 def parse_args_to_dict(argv):
     args_dict = {}
@@ -24,13 +27,6 @@ def parse_args_to_dict(argv):
     return args_dict
 
 
-# Helper function
-def read_problem_instance(instance_path):
-    with open(instance_path, "r") as file:
-        data = json.load(file)
-        return data[0]
-
-
 # Helper function
 def calculateObjectiveFunction(contacts):
     result = 0
@@ -74,15 +70,6 @@ try:
 
     config = args
 
-    # Read problem instance
-    print("Read problem instance")
-    problemInstance = read_problem_instance(instance_path_json)
-    satellitePasses = problemInstance["satellite_passes"]
-    serviceTargets = problemInstance["service_targets"]
-
-    V = list(range(len(satellitePasses)))
-    S = list(range(len(serviceTargets)))
-
     model = Model("Satellite Optimization")
     model.readProblem(instance_path_mps)
 
@@ -120,18 +107,18 @@ try:
                 i, j = int(i_str), int(j_str)
                 x[i, j] = var
 
-    contacts = []
-    for i in V:
-        for j in S:
-            if (i, j) in x:
-                val = model.getVal(x[i, j])
-                if val > 0.5:
-                    contacts.append(
-                        {
-                            "satellitePass": satellitePasses[i],
-                            "serviceTarget": serviceTargets[j],
-                        }
-                    )
+    # Chosen (pass, target) positions
+    chosen = sorted((i, j) for (i, j), var in x.items() if model.getVal(var) > 0.5)
+
+    # Only the records of the chosen contacts are kept while reading the instance
+    print("Read problem instance")
+    satellitePasses, serviceTargets = read_problem_instance_records(
+        instance_path_json, {i for i, _ in chosen}, {j for _, j in chosen}
+    )
+    contacts = [
+        {"satellitePass": satellitePasses[i], "serviceTarget": serviceTargets[j]}
+        for i, j in chosen
+    ]
 
     # Compute objectives
     if len(contacts) > 0:
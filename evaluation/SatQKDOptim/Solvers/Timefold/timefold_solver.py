@@ -42,6 +42,7 @@ def read_contacts_from_timefold(file_path):
                     ),
                     "achievableKeyVolume": satellite_pass.get("achievableKeyVolume"),
                     "orbitId": satellite_pass.get("orbitId"),
+                    "satelliteId": satellite_pass.get("satelliteId"),
                 },
             }
         )
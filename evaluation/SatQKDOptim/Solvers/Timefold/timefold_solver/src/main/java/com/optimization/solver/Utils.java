@@ -62,6 +62,7 @@ public class Utils {
             JsonNode passes = instance.get("satellite_passes");
             if (passes != null) {
                 for (JsonNode pass : passes) {
+                    // Passes of instances without satelliteId belong to satellite 0
                     SatellitePass satellitePass = mapper.treeToValue(pass, SatellitePass.class);
                     satellitePasses.add(satellitePass);
                 }
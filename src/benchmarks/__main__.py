@@ -0,0 +1,104 @@
+"""
+Benchmarks for the stages of problem instance generation and solving
+
+Run as python -m src.benchmarks -benchmark <name>
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+from ..input.ground_terminals import europe_ground_terminals
+from ..input.quarc_data_generation import ELEVATION_ENGINES
+from .propagation import (
+    benchmark_time_grid,
+    benchmark_elevation_engines,
+    benchmark_pass_detection,
+    benchmark_propagation_backends,
+    benchmark_terminal_scaling,
+    benchmark_constellation,
+    benchmark_prefilter,
+)
+from .weather import benchmark_weather, benchmark_weather_prefetch
+from .cache import benchmark_cache, benchmark_horizon_chunks
+from .startup import benchmark_startup
+from .instances import benchmark_instance_reader
+from .models import (
+    benchmark_assignment_pairs,
+    benchmark_model_builders,
+    benchmark_conflict_formulations,
+    benchmark_presolve,
+)
+
+BENCHMARKS = {
+    "timegrid": benchmark_time_grid,
+    "elevation": benchmark_elevation_engines,
+    "passes": benchmark_pass_detection,
+    "backends": benchmark_propagation_backends,
+    "weather": benchmark_weather,
+    "prefetch": benchmark_weather_prefetch,
+    "cache": benchmark_cache,
+    "horizon": benchmark_horizon_chunks,
+    "terminals": benchmark_terminal_scaling,
+    "constellation": benchmark_constellation,
+    "prefilter": benchmark_prefilter,
+    "startup": benchmark_startup,
+    "reader": benchmark_instance_reader,
+    "pairs": benchmark_assignment_pairs,
+    "builders": benchmark_model_builders,
+    "conflicts": benchmark_conflict_formulations,
+    "presolve": benchmark_presolve,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-benchmark", choices=BENCHMARKS, default="elevation")
+    parser.add_argument("-start", default="2024-04-15T00:00:00")
+    parser.add_argument("-planning_horizon", type=int, default=12)
+    parser.add_argument("-step_duration", type=int, default=10)
+    parser.add_argument("-min_elevation_angle", type=float, default=15)
+    parser.add_argument("-engines", default=",".join(ELEVATION_ENGINES))
+    parser.add_argument("-coarse_step", type=int, default=60)
+    parser.add_argument("-workers", type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument("-satellites", type=int)
+    parser.add_argument("-num_app_contexts", type=int)
+    parser.add_argument(
+        "-instances",
+        nargs="+",
+        help="JSON instances for -benchmark builders, conflicts and presolve",
+    )
+    args = parser.parse_args()
+
+    start_time = np.datetime64(args.start)
+    end_time = start_time + np.timedelta64(args.planning_horizon, "h")
+    options = {}
+    if args.benchmark == "elevation":
+        options["engines"] = args.engines.split(",")
+    elif args.benchmark == "passes":
+        options["coarse_step"] = args.coarse_step
+    elif args.benchmark == "terminals":
+        options["workers"] = args.workers
+    elif args.benchmark in ("constellation", "prefilter") and args.satellites:
+        options["number_satellites"] = args.satellites
+    elif args.benchmark in ("reader", "pairs") and args.num_app_contexts:
+        options["number_application_contexts"] = args.num_app_contexts
+    elif args.benchmark in ("builders", "conflicts", "presolve"):
+        if args.num_app_contexts:
+            options["number_application_contexts"] = args.num_app_contexts
+        options["instance_files"] = args.instances
+    result = BENCHMARKS[args.benchmark](
+        europe_ground_terminals,
+        start_time,
+        end_time,
+        args.step_duration,
+        args.min_elevation_angle,
+        **options,
+    )
+    # The startup check fails the run, so it can guard the import time in scripts
+    if args.benchmark == "startup" and not result:
+        sys.exit("Import time budget exceeded")
+
+
+if __name__ == "__main__":
+    main()
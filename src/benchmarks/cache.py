@@ -0,0 +1,152 @@
+"""
+Benchmarks of the SQLite cache and of the pass cache per time chunk
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ..input.cache import SQLiteCache
+from ..input.quarc_data_generation import get_quarc_satellite_passes
+from ..input.weather import prefetch_weather
+from .stand_in_weather import start_stand_in_weather_server
+
+
+def write_cache_entries(cache_file, worker, entries):
+    # One write transaction per entry to provoke lock contention between processes
+    cache = SQLiteCache(cache_file)
+    for i in range(entries):
+        cache.set(("worker", worker, i), {"worker": worker, "entry": i})
+        cache.get(("worker", worker, i))
+    return cache.hits, cache.misses
+
+
+# Writes and reads the SQLite cache from several processes at once and compares
+# per-key lookups with one bulk lookup
+def benchmark_cache(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    workers=8,
+    entries=200,
+):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = os.path.join(cache_dir, "cache.sqlite")
+        cache = SQLiteCache(cache_file)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counters = list(
+                executor.map(
+                    write_cache_entries,
+                    [cache_file] * workers,
+                    range(workers),
+                    [entries] * workers,
+                )
+            )
+        write_runtime = time.perf_counter() - start
+
+        keys = [
+            ("worker", worker, i) for worker in range(workers) for i in range(entries)
+        ]
+        start = time.perf_counter()
+        single_values = [cache.get(key) for key in keys]
+        single_runtime = time.perf_counter() - start
+        start = time.perf_counter()
+        bulk_values = cache.get_many(keys)
+        bulk_runtime = time.perf_counter() - start
+        missing = cache.get_many([("worker", workers, 0)])
+
+        complete = all(
+            single_value == bulk_values[key] == {"worker": key[1], "entry": key[2]}
+            for key, single_value in zip(keys, single_values)
+        )
+        print("###### Cache ######")
+        print("Processes:", workers)
+        print(f"Writes and reads: {workers * entries} each, {write_runtime:.2f}s")
+        print(
+            "Worker hits / misses:",
+            sum(hits for hits, _ in counters),
+            "/",
+            sum(misses for _, misses in counters),
+        )
+        print("Entries:", len(cache), "complete:", complete and len(missing) == 0)
+        print(f"Per-key lookups: {single_runtime:.2f}s")
+        print(f"Bulk lookup: {bulk_runtime:.3f}s")
+        print("Lookup counters:", cache.hits, "hits", cache.misses, "misses")
+        print("###################")
+    return write_runtime, single_runtime, bulk_runtime
+
+
+# Generates growing planning horizons from the same start in sequence, once with the
+# pass cache per whole window and once per time chunk
+def benchmark_horizon_chunks(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    horizons=(12, 24),
+):
+    horizons = sorted(
+        {*horizons, int((end_time - start_time) / np.timedelta64(1, "h"))}
+    )
+    server, url = start_stand_in_weather_server()
+    runtimes = {}
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        weather_cache_file = os.path.join(cache_dir, "weather_cache.sqlite")
+        try:
+            # Weather is shared by both modes and fetched beforehand
+            days = np.arange(
+                start_time.astype("datetime64[D]"),
+                start_time.astype("datetime64[D]") + max(horizons) // 24 + 2,
+            ).astype(str)
+            prefetch_weather(
+                {
+                    (position["lat"], position["lon"]): days
+                    for position in ground_terminals.values()
+                },
+                url,
+                weather_cache_file,
+            )
+
+            # A chunk longer than any window caches each window as a whole
+            for mode, chunk_duration in (("Window", 10**10), ("Chunked", 6 * 3600)):
+                for horizon in horizons:
+                    start = time.perf_counter()
+                    results[mode, horizon] = get_quarc_satellite_passes(
+                        ground_terminals,
+                        start_time,
+                        start_time + np.timedelta64(horizon, "h"),
+                        step_duration,
+                        min_elevation_angle,
+                        cache_file=os.path.join(cache_dir, f"{mode}.sqlite"),
+                        chunk_duration=chunk_duration,
+                        weather_url=url,
+                        weather_cache_file=weather_cache_file,
+                    )
+                    runtimes[mode, horizon] = time.perf_counter() - start
+        finally:
+            server.shutdown()
+
+    print("###### Horizon chunks ######")
+    print("Terminals:", len(ground_terminals))
+    for horizon in horizons:
+        same = results["Window", horizon] == results["Chunked", horizon]
+        print(
+            f"{horizon}h: window cache {runtimes['Window', horizon]:.2f}s, "
+            f"chunk cache {runtimes['Chunked', horizon]:.2f}s, same passes: {same}"
+        )
+    total = {
+        mode: sum(runtimes[mode, horizon] for horizon in horizons)
+        for mode in ("Window", "Chunked")
+    }
+    print(
+        f"Total: window cache {total['Window']:.2f}s, chunk cache {total['Chunked']:.2f}s"
+    )
+    print("############################")
+    return total
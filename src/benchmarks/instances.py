@@ -0,0 +1,87 @@
+"""
+Benchmarks of the JSON, streaming and .npz instance readers
+"""
+
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from ..input.create_problems import save_problem_instances_to_json
+from ..instance_format import (
+    convert_json_to_npz,
+    read_problem_instance_arrays,
+    read_problem_instance_streaming,
+)
+from .synthetic import get_synthetic_problem_instance
+
+
+# Writes a synthetic JSON instance and reads it with json.load, the streaming reader
+# and from the converted .npz, with the peak of traced memory of every reader
+def benchmark_instance_reader(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_application_contexts=100,
+):
+    problem_instance = get_synthetic_problem_instance(
+        ground_terminals, start_time, end_time, number_application_contexts
+    )
+
+    def read_json(file_name):
+        with open(file_name, "r") as f:
+            return json.load(f)[0]
+
+    runtimes = {}
+    peaks = {}
+    results = {}
+    with tempfile.TemporaryDirectory() as instance_dir:
+        json_file = os.path.join(instance_dir, "instance.json")
+        save_problem_instances_to_json([problem_instance], json_file)
+        del problem_instance
+        npz_file = convert_json_to_npz(json_file)
+        file_sizes = {
+            "JSON": os.path.getsize(json_file),
+            "npz": os.path.getsize(npz_file),
+        }
+
+        for mode, read in (
+            ("json.load", read_json),
+            ("Streaming", read_problem_instance_streaming),
+            ("npz", read_problem_instance_arrays),
+        ):
+            tracemalloc.start()
+            start = time.perf_counter()
+            results[mode] = read(json_file if mode != "npz" else npz_file)
+            runtimes[mode] = time.perf_counter() - start
+            peaks[mode] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        # The streamed columns match the records of json.load and the .npz columns
+        same = all(
+            np.array_equal(results["Streaming"][table][key], results["npz"][table][key])
+            and len(results["json.load"][table]) == len(results["npz"][table][key])
+            for table in ("satellite_passes", "service_targets")
+            for key in results["npz"][table]
+        )
+        del results
+
+    print("###### Instance reader ######")
+    print(
+        "Terminals:",
+        len(ground_terminals),
+        "app contexts:",
+        number_application_contexts,
+    )
+    for file_format, size in file_sizes.items():
+        print(f"{file_format} file: {size / 2**20:.1f} MiB")
+    for mode in runtimes:
+        print(
+            f"{mode}: {runtimes[mode]:.3f}s, peak memory {peaks[mode] / 2**20:.1f} MiB"
+        )
+    print("Same columns:", same)
+    print("#############################")
+    return runtimes, peaks
@@ -0,0 +1,458 @@
+"""
+Benchmarks of the model builders, the non-overlap formulations and the presolve
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+from scipy import sparse
+from scipy.optimize import milp, linprog, LinearConstraint, Bounds
+from ..input.create_problems import build_model, save_problem_instances_to_json
+from ..utils import get_assignment_pairs, group_assignment_pairs, read_problem_instance
+from ..presolve import presolve_problem_instance
+from ..formulation import (
+    get_model_matrices,
+    build_model_matrix,
+    build_scip_model,
+    CONFLICT_FORMULATIONS,
+)
+from ..instance_format import read_problem_instance_streaming
+from .synthetic import get_synthetic_problem_instance, write_synthetic_instances
+
+
+# Creates the (pass, target) pairs of the decision variables of a synthetic instance
+# with the double loop over all passes and targets and with get_assignment_pairs, and
+# counts the (pass, target) lookups of the assignment and non-overlap rows with and
+# without the per-pass assignment expressions
+def benchmark_assignment_pairs(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_application_contexts=80,
+):
+    problem_instance = get_synthetic_problem_instance(
+        ground_terminals, start_time, end_time, number_application_contexts
+    )
+    satellite_passes = problem_instance["satellite_passes"]
+    service_targets = problem_instance["service_targets"]
+    V = list(range(len(satellite_passes)))
+    S = list(range(len(service_targets)))
+    ni = {i: sp["nodeId"] for i, sp in enumerate(satellite_passes)}
+    oi = {
+        i: 1 if sp["achievableKeyVolume"] == 0.0 else 0
+        for i, sp in enumerate(satellite_passes)
+    }
+    sj = {j: st["nodeId"] for j, st in enumerate(service_targets)}
+    mj = {
+        j: 1 if st["requestedOperation"] == "QKD" else 0
+        for j, st in enumerate(service_targets)
+    }
+
+    runtimes = {}
+    start = time.perf_counter()
+    loop_pairs = [
+        (i, j)
+        for i in V
+        for j in S
+        if ni[i] == sj[j] and not (oi[i] == 1 and mj[j] == 1)
+    ]
+    runtimes["Double loop"] = time.perf_counter() - start
+    start = time.perf_counter()
+    node_pairs = get_assignment_pairs(ni, oi, sj, mj)
+    runtimes["Grouped by node"] = time.perf_counter() - start
+    start = time.perf_counter()
+    pass_targets, target_passes = group_assignment_pairs(node_pairs)
+    runtimes["Row index"] = time.perf_counter() - start
+
+    # Conflicting pass pairs of the non-overlap rows, as enumerated by the builders
+    T_min = 60
+    reference_time = np.datetime64(start_time, "s")
+    ti = [
+        (np.datetime64(sp["startTime"]) - reference_time) / np.timedelta64(1, "s")
+        for sp in satellite_passes
+    ]
+    di = [
+        (np.datetime64(sp["endTime"]) - np.datetime64(sp["startTime"]))
+        / np.timedelta64(1, "s")
+        for sp in satellite_passes
+    ]
+    sorted_V = sorted(V, key=lambda i: ti[i])
+    conflicts = 0
+    for idx1, i1 in enumerate(sorted_V):
+        for i2 in sorted_V[idx1 + 1 :]:
+            if ti[i2] - (ti[i1] + di[i1]) >= T_min:
+                break
+            conflicts += 1
+    # Before: every row scanned all targets (or passes), one scan per conflict pass
+    lookups_before = 2 * len(V) * len(S) + 2 * conflicts * len(S)
+    # Now: every pair is visited once for the pass and once for the target rows
+    lookups_now = sum(map(len, pass_targets.values())) + sum(
+        map(len, target_passes.values())
+    )
+
+    print("###### Assignment pairs ######")
+    print("Passes:", len(V), "targets:", len(S))
+    print("Pairs visited by the double loop:", len(V) * len(S))
+    print("Decision variables:", len(node_pairs))
+    for mode, runtime in runtimes.items():
+        print(f"Runtime {mode}: {runtime:.3f}s")
+    print(f"Speedup: {runtimes['Double loop'] / runtimes['Grouped by node']:.0f}x")
+    print("Same pairs in the same order:", loop_pairs == node_pairs)
+    print("Non-overlap rows:", conflicts)
+    print(f"Pair lookups in the rows: {lookups_before} before, {lookups_now} now")
+    print("##############################")
+    return runtimes
+
+
+def get_canonical_model(model):
+    # Variable names, objective and rows in "<=" form of a Gurobi model, for comparing
+    # formulations that differ only in the sign convention of their rows
+    rows = model.getA().tocsr()
+    senses = np.array(model.getAttr("Sense", model.getConstrs()))
+    rhs = np.array(model.getAttr("RHS", model.getConstrs()))
+    sign = np.where(senses == ">", -1.0, 1.0)
+    rows = (sparse.diags(sign) @ rows).tocsr()
+    rows.sort_indices()
+    return (
+        model.getAttr("VarName", model.getVars()),
+        np.array(model.getAttr("Obj", model.getVars())) * model.ModelSense,
+        rows,
+        rhs * sign,
+        senses == "=",
+    )
+
+
+def is_same_model(model, other):
+    names, objective, rows, rhs, equalities = get_canonical_model(model)
+    other_names, other_objective, other_rows, other_rhs, other_equalities = (
+        get_canonical_model(other)
+    )
+    if rows.shape != other_rows.shape:
+        return False
+    difference = abs(rows - other_rows)
+    return (
+        names == other_names
+        and np.allclose(objective, other_objective)
+        and (difference.nnz == 0 or difference.max() <= 1e-9)
+        and np.allclose(rhs, other_rhs)
+        and np.array_equal(equalities, other_equalities)
+    )
+
+
+# Builds the MPS model of synthetic 12h, 24h and 48h instances (or the given instance
+# files) row by row and with the matrix API and checks that both are the same model.
+# Without Gurobi only the index structures of both builders are compared
+def benchmark_model_builders(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_application_contexts=80,
+    instance_files=None,
+):
+    try:
+        import gurobipy
+    except ImportError:
+        gurobipy = None
+
+    rows = []
+    with tempfile.TemporaryDirectory() as instance_dir:
+        if instance_files is None:
+            instance_files = write_synthetic_instances(
+                ground_terminals,
+                start_time,
+                (12, 24, 48),
+                number_application_contexts,
+                instance_dir,
+            )
+
+        for json_file in instance_files:
+            runtimes = {}
+            problem_instance = read_problem_instance(json_file)
+            columns = read_problem_instance_streaming(json_file)
+            start = time.perf_counter()
+            matrices = get_model_matrices(columns)
+            runtimes["Matrices"] = time.perf_counter() - start
+            if gurobipy is None:
+                # Index structures of the row by row builder
+                passes = problem_instance["satellite_passes"]
+                targets = problem_instance["service_targets"]
+                start = time.perf_counter()
+                pairs = get_assignment_pairs(
+                    {i: sp["nodeId"] for i, sp in enumerate(passes)},
+                    {
+                        i: 1 if sp["achievableKeyVolume"] == 0.0 else 0
+                        for i, sp in enumerate(passes)
+                    },
+                    {j: st["nodeId"] for j, st in enumerate(targets)},
+                    {
+                        j: 1 if st["requestedOperation"] == "QKD" else 0
+                        for j, st in enumerate(targets)
+                    },
+                )
+                runtimes["Pairs"] = time.perf_counter() - start
+                same = pairs == list(
+                    zip(
+                        matrices["pass_index"].tolist(),
+                        matrices["target_index"].tolist(),
+                    )
+                )
+            else:
+                models = {}
+                for mode, build in (
+                    ("Loop", lambda: build_model(problem_instance)),
+                    ("Matrix API", lambda: build_model_matrix(columns)),
+                ):
+                    start = time.perf_counter()
+                    models[mode] = build()
+                    models[mode].update()
+                    mps_file = os.path.join(instance_dir, f"{mode}.mps")
+                    models[mode].write(mps_file)
+                    runtimes[mode] = time.perf_counter() - start
+                # The written files are compared, read back into Gurobi
+                same = is_same_model(
+                    gurobipy.read(os.path.join(instance_dir, "Loop.mps")),
+                    gurobipy.read(os.path.join(instance_dir, "Matrix API.mps")),
+                )
+            rows.append(
+                (
+                    os.path.basename(json_file),
+                    len(matrices["names"]),
+                    matrices["conflict_rows"].shape[0],
+                    runtimes,
+                    same,
+                )
+            )
+
+    print("###### Model builders ######")
+    if gurobipy is None:
+        print("gurobipy is not installed, only the index structures are compared")
+    for name, number_variables, number_conflicts, runtimes, same in rows:
+        print(
+            f"{name}: {number_variables} variables, {number_conflicts} non-overlap rows"
+        )
+        for mode, runtime in runtimes.items():
+            print(f"  Runtime {mode}: {runtime:.3f}s")
+        if "Loop" in runtimes:
+            print(f"  Speedup: {runtimes['Loop'] / runtimes['Matrix API']:.1f}x")
+        print("  Same model:" if gurobipy else "  Same variables:", same)
+    print("############################")
+    return rows
+
+
+def get_inequality_rows(matrices):
+    # All rows of the model in "<=" form
+    conflict_sign = 1.0 if matrices["conflict_sense"] == "<" else -1.0
+    rows = sparse.vstack(
+        [
+            matrices["pass_rows"],
+            matrices["target_rows"],
+            conflict_sign * matrices["conflict_rows"],
+        ]
+    ).tocsr()
+    rhs = np.concatenate(
+        [
+            np.ones(matrices["pass_rows"].shape[0] + matrices["target_rows"].shape[0]),
+            conflict_sign * matrices["conflict_rhs"],
+        ]
+    )
+    return rows, rhs
+
+
+def solve_highs(columns, matrices, conflict_formulation, time_limit):
+    rows, rhs = get_inequality_rows(matrices)
+    start = time.perf_counter()
+    result = milp(
+        -matrices["objective"],
+        constraints=LinearConstraint(rows, -np.inf, rhs),
+        integrality=np.ones(len(matrices["objective"])),
+        bounds=Bounds(0, 1),
+        options={"time_limit": time_limit},
+    )
+    objective = -result.fun if result.x is not None else None
+    return time.perf_counter() - start, objective
+
+
+def solve_gurobi(columns, matrices, conflict_formulation, time_limit):
+    model = build_model_matrix(columns, conflict_formulation=conflict_formulation)
+    model.setParam("OutputFlag", 0)
+    model.setParam("TimeLimit", time_limit)
+    model.optimize()
+    return model.Runtime, model.ObjVal if model.SolCount > 0 else None
+
+
+def solve_scip(columns, matrices, conflict_formulation, time_limit):
+    model = build_scip_model(matrices)
+    model.hideOutput()
+    model.setParam("limits/time", time_limit)
+    model.optimize()
+    return model.getSolvingTime(), model.getObjVal() if model.getNSols() > 0 else None
+
+
+# Solvers of the conflict benchmark and the module each of them needs
+CONFLICT_SOLVERS = {
+    "HiGHS": (None, solve_highs),
+    "Gurobi": ("gurobipy", solve_gurobi),
+    "SCIP": ("pyscipopt", solve_scip),
+}
+
+
+# Compares the big-M and the clique formulation of the non-overlap rows on a
+# synthetic 12h instance (or the given instance files): size, LP relaxation bound and
+# the solve time of every installed solver. The root gap is the gap between the LP
+# relaxation and the best objective found with either formulation
+def benchmark_conflict_formulations(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_application_contexts=80,
+    instance_files=None,
+    time_limit=300,
+):
+    solvers = {}
+    for solver, (module, solve) in CONFLICT_SOLVERS.items():
+        try:
+            if module is not None:
+                __import__(module)
+            solvers[solver] = solve
+        except ImportError:
+            print(f"{module} is not installed, {solver} is skipped")
+
+    results = []
+    with tempfile.TemporaryDirectory() as instance_dir:
+        if instance_files is None:
+            instance_files = write_synthetic_instances(
+                ground_terminals,
+                start_time,
+                (12,),
+                number_application_contexts,
+                instance_dir,
+            )
+
+        for json_file in instance_files:
+            columns = read_problem_instance_streaming(json_file)
+            formulations = {}
+            for conflict_formulation in CONFLICT_FORMULATIONS:
+                matrices = get_model_matrices(
+                    columns, conflict_formulation=conflict_formulation
+                )
+                rows, rhs = get_inequality_rows(matrices)
+                relaxation = linprog(
+                    -matrices["objective"],
+                    A_ub=rows,
+                    b_ub=rhs,
+                    bounds=(0, 1),
+                    method="highs",
+                )
+                formulations[conflict_formulation] = {
+                    "rows": matrices["conflict_rows"].shape[0],
+                    "nonzeros": matrices["conflict_rows"].nnz,
+                    "bound": -relaxation.fun,
+                    "solvers": {
+                        solver: solve(
+                            columns, matrices, conflict_formulation, time_limit
+                        )
+                        for solver, solve in solvers.items()
+                    },
+                }
+            results.append((os.path.basename(json_file), formulations))
+
+    print("###### Conflict formulations ######")
+    for name, formulations in results:
+        print(name)
+        objectives = [
+            objective
+            for formulation in formulations.values()
+            for _, objective in formulation["solvers"].values()
+            if objective is not None
+        ]
+        best = max(objectives, default=None)
+        for conflict_formulation, formulation in formulations.items():
+            print(
+                f"  {conflict_formulation}: {formulation['rows']} non-overlap rows, "
+                f"{formulation['nonzeros']} nonzeros, "
+                f"LP bound {formulation['bound']:.2f}"
+                + (
+                    f", root gap {max(formulation['bound'] - best, 0) / abs(best):.2%}"
+                    if best
+                    else ""
+                )
+            )
+            for solver, (runtime, objective) in formulation["solvers"].items():
+                print(f"    {solver}: {runtime:.2f}s, objective {objective}")
+    print("###################################")
+    return results
+
+
+# Solves synthetic 12h, 24h and 48h instances (or the given instance files) before and
+# after the dominance presolve with HiGHS in the clique formulation, the optimum must
+# not change
+def benchmark_presolve(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_application_contexts=80,
+    instance_files=None,
+    time_limit=300,
+):
+    results = []
+    with tempfile.TemporaryDirectory() as instance_dir:
+        if instance_files is None:
+            instance_files = write_synthetic_instances(
+                ground_terminals,
+                start_time,
+                (12, 24, 48),
+                number_application_contexts,
+                instance_dir,
+            )
+
+        for json_file in instance_files:
+            start = time.perf_counter()
+            reduced_instance, kept = presolve_problem_instance(
+                read_problem_instance(json_file)
+            )
+            presolve_runtime = time.perf_counter() - start
+            presolved_file = os.path.join(instance_dir, "presolved.json")
+            save_problem_instances_to_json([reduced_instance], presolved_file)
+
+            solves = {}
+            for mode, instance_file in (
+                ("Original", json_file),
+                ("Presolved", presolved_file),
+            ):
+                matrices = get_model_matrices(
+                    read_problem_instance_streaming(instance_file),
+                    conflict_formulation="clique",
+                )
+                runtime, objective = solve_highs(None, matrices, "clique", time_limit)
+                solves[mode] = (
+                    matrices["target_rows"].shape[0],
+                    len(matrices["names"]),
+                    runtime,
+                    objective,
+                )
+            results.append((os.path.basename(json_file), presolve_runtime, solves))
+
+    print("###### Presolve ######")
+    for name, presolve_runtime, solves in results:
+        print(f"{name}: presolve took {presolve_runtime:.3f}s")
+        for mode, (targets, variables, runtime, objective) in solves.items():
+            print(
+                f"  {mode}: {targets} targets, {variables} variables, "
+                f"HiGHS {runtime:.2f}s, objective {objective}"
+            )
+        objectives = [objective for *_, objective in solves.values()]
+        print(
+            "  Same optimum:",
+            None not in objectives and np.isclose(objectives[0], objectives[1]),
+        )
+    print("######################")
+    return results
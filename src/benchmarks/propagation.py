@@ -0,0 +1,429 @@
+"""
+Benchmarks of the satellite propagation, elevation and pass detection stages
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from ..input.quarc_data_generation import (
+    tle_lines,
+    get_timescale,
+    get_satellite,
+    ELEVATION_ENGINES,
+    get_terminal_elevations,
+    get_sampled_passes,
+    get_refined_passes,
+    calculate_key_volumes,
+    calculate_satellite_passes,
+    get_propagator,
+    get_constellation_propagator,
+    get_satellites,
+    get_quarc_satellite_passes,
+    seconds_to_skyfield_times,
+    PROPAGATION_BACKENDS,
+    PREFILTER_STEP,
+)
+from ..input.propagation import (
+    get_terminal_geometry,
+    get_elevation_matrix,
+    get_grouped_visible_samples,
+)
+from ..input.weather import prefetch_weather
+from .stand_in_weather import start_stand_in_weather_server
+from .synthetic import get_synthetic_ground_terminals, get_synthetic_tles
+
+
+# Time grid construction used before the vectorized grid, kept as the baseline
+def build_skyfield_times_per_element(start_time, end_time, step_duration):
+    time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+    return get_timescale().utc(
+        [t.astype(datetime).year for t in time_steps],
+        [t.astype(datetime).month for t in time_steps],
+        [t.astype(datetime).day for t in time_steps],
+        [t.astype(datetime).hour for t in time_steps],
+        [t.astype(datetime).minute for t in time_steps],
+        [t.astype(datetime).second for t in time_steps],
+    )
+
+
+# Compares the per-element time grid construction with the vectorized one
+def benchmark_time_grid(
+    ground_terminals, start_time, end_time, step_duration, min_elevation_angle
+):
+    start = time.perf_counter()
+    per_element_times = build_skyfield_times_per_element(
+        start_time, end_time, step_duration
+    )
+    per_element_runtime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+    vectorized_times = seconds_to_skyfield_times(
+        start_time, (time_steps - start_time) / np.timedelta64(1, "s")
+    )
+    vectorized_runtime = time.perf_counter() - start
+
+    max_deviation = np.max(np.abs(vectorized_times.tt - per_element_times.tt)) * 86400
+
+    # Before the change the grid was rebuilt for every terminal
+    print("###### Time grid ######")
+    print("Time steps:", len(time_steps))
+    print(f"Per element, once: {per_element_runtime:.3f}s")
+    print(
+        f"Per element, {len(ground_terminals)} terminals: "
+        f"{per_element_runtime * len(ground_terminals):.2f}s"
+    )
+    print(f"Vectorized, shared by all terminals: {vectorized_runtime:.3f}s")
+    print(f"Max time deviation: {max_deviation:.2e}s")
+    print("#######################")
+    return per_element_runtime, vectorized_runtime
+
+
+# Compares elevation engines against the first (reference) engine in the list
+def benchmark_elevation_engines(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    engines=ELEVATION_ENGINES,
+):
+    satellite = get_satellite(*tle_lines)
+    time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+    skyfield_times = seconds_to_skyfield_times(
+        start_time, (time_steps - start_time) / np.timedelta64(1, "s")
+    )
+
+    runtimes = {}
+    elevations = {}
+    for engine in engines:
+        start = time.perf_counter()
+        elevations[engine] = get_terminal_elevations(
+            satellite, ground_terminals, skyfield_times, engine
+        )
+        runtimes[engine] = time.perf_counter() - start
+
+    print("###### Elevation engines ######")
+    print("Terminals:", len(ground_terminals))
+    print("Time steps per terminal:", len(skyfield_times))
+    reference = engines[0]
+    for engine in engines:
+        # All engines have to detect the same visible samples as the reference
+        max_deviation = np.max(np.abs(elevations[engine] - elevations[reference]))
+        mismatches = np.count_nonzero(
+            (elevations[engine] >= min_elevation_angle)
+            != (elevations[reference] >= min_elevation_angle)
+        )
+        print(
+            f"{engine}: {runtimes[engine]:.2f}s, "
+            f"speedup {runtimes[reference] / runtimes[engine]:.1f}x, "
+            f"max deviation {max_deviation:.2e} deg, "
+            f"visibility mismatches {mismatches}"
+        )
+    print("###############################")
+    return runtimes
+
+
+# Compares brute-force sampled pass detection with coarse grid plus root-finding,
+# including the key volumes
+def benchmark_pass_detection(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    coarse_step=60,
+):
+    satellite = get_satellite(*tle_lines)
+
+    start = time.perf_counter()
+    sampled_passes, elevations, sample_counts = get_sampled_passes(
+        [satellite],
+        ground_terminals,
+        start_time,
+        end_time,
+        step_duration,
+        min_elevation_angle,
+    )
+    sampled_passes["Key Volume"] = calculate_key_volumes(
+        elevations, sample_counts, step_duration
+    )
+    sampled_runtime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    refined_passes = get_refined_passes(
+        [satellite],
+        ground_terminals,
+        start_time,
+        end_time,
+        min_elevation_angle,
+        coarse_step,
+    )
+    refined_runtime = time.perf_counter() - start
+
+    # Refined boundaries may only move outwards by less than one sampling step
+    sampled_passes = sampled_passes.sort_values(["Station", "Start"])
+    refined_passes = refined_passes.sort_values(["Station", "Start"])
+    start_shifts = (
+        sampled_passes["Start"].to_numpy(dtype="datetime64[s]")
+        - refined_passes["Start"].to_numpy(dtype="datetime64[s]")
+    ) / np.timedelta64(1, "s")
+    end_shifts = (
+        refined_passes["End"].to_numpy(dtype="datetime64[s]")
+        - sampled_passes["End"].to_numpy(dtype="datetime64[s]")
+    ) / np.timedelta64(1, "s")
+
+    print("###### Pass detection ######")
+    print("Terminals:", len(ground_terminals))
+    print("Passes sampled / refined:", len(sampled_passes), "/", len(refined_passes))
+    print(f"Runtime sampled ({step_duration}s step): {sampled_runtime:.2f}s")
+    print(f"Runtime refined ({coarse_step}s coarse step): {refined_runtime:.2f}s")
+    print(f"Speedup: {sampled_runtime / refined_runtime:.1f}x")
+    print(
+        f"Start moved earlier by {min(start_shifts):.0f}s to {max(start_shifts):.0f}s"
+    )
+    print(f"End moved later by {min(end_shifts):.0f}s to {max(end_shifts):.0f}s")
+    print(
+        "Total key volume refined / sampled:",
+        refined_passes["Key Volume"].sum() / sampled_passes["Key Volume"].sum(),
+    )
+    print("############################")
+    return sampled_runtime, refined_runtime
+
+
+# Compares the direct sgp4 backend with the Skyfield propagation path
+def benchmark_propagation_backends(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    tolerance=1e-3,
+):
+    satellite = get_satellite(*tle_lines)
+    time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+    time_offsets = (time_steps - start_time) / np.timedelta64(1, "s")
+    terminal_xyz, terminal_up = get_terminal_geometry(ground_terminals)
+
+    runtimes = {}
+    elevations = {}
+    for backend in PROPAGATION_BACKENDS:
+        start = time.perf_counter()
+        propagate = get_propagator(satellite, start_time, backend)
+        elevations[backend] = get_elevation_matrix(
+            propagate(time_offsets), terminal_xyz, terminal_up
+        )
+        runtimes[backend] = time.perf_counter() - start
+
+    max_deviation = np.max(np.abs(elevations["sgp4"] - elevations["skyfield"]))
+    mismatches = np.count_nonzero(
+        (elevations["sgp4"] >= min_elevation_angle)
+        != (elevations["skyfield"] >= min_elevation_angle)
+    )
+
+    print("###### Propagation backends ######")
+    print("Terminals:", len(ground_terminals))
+    print("Time steps:", len(time_offsets))
+    for backend, runtime in runtimes.items():
+        print(f"Runtime {backend}: {runtime:.2f}s")
+    print(f"Speedup: {runtimes['skyfield'] / runtimes['sgp4']:.1f}x")
+    print(f"Max elevation deviation: {max_deviation:.2e} deg")
+    print("Visibility mismatches:", mismatches)
+    print("Within tolerance:", bool(max_deviation <= tolerance))
+    print("##################################")
+    return runtimes
+
+
+# Compares single-process and multi-process pass calculation for growing synthetic
+# terminal networks (the given ground terminals are not used)
+def benchmark_terminal_scaling(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    sizes=(100, 1000, 5000),
+    workers=max(2, os.cpu_count() or 1),
+):
+    satellite = get_satellite(*tle_lines)
+    rows = []
+    for number_terminals in sizes:
+        terminals = get_synthetic_ground_terminals(number_terminals)
+        runtimes = {}
+        passes = {}
+        for number_workers in (1, workers):
+            start = time.perf_counter()
+            passes[number_workers] = calculate_satellite_passes(
+                [satellite],
+                terminals,
+                start_time,
+                end_time,
+                step_duration,
+                min_elevation_angle,
+                workers=number_workers,
+            )
+            runtimes[number_workers] = time.perf_counter() - start
+        same = passes[1][["Station", "Start", "End"]].equals(
+            passes[workers][["Station", "Start", "End"]]
+        ) and np.allclose(passes[1]["Key Volume"], passes[workers]["Key Volume"])
+        rows.append((number_terminals, len(passes[1]), runtimes, same))
+
+    print("###### Terminal scaling ######")
+    print("CPUs:", os.cpu_count(), "workers:", workers)
+    for number_terminals, number_passes, runtimes, same in rows:
+        print(
+            f"{number_terminals} terminals, {number_passes} passes: "
+            f"1 process {runtimes[1]:.2f}s, {workers} processes "
+            f"{runtimes[workers]:.2f}s, speedup {runtimes[1] / runtimes[workers]:.1f}x, "
+            f"same passes: {same}"
+        )
+    print("##############################")
+    return rows
+
+
+# Generates the passes of a synthetic constellation once batched over all satellites
+# and once satellite by satellite, with the peak of traced memory of both
+def benchmark_constellation(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_satellites=50,
+):
+    tles = get_synthetic_tles(number_satellites)
+    server, url = start_stand_in_weather_server()
+    runtimes = {}
+    peaks = {}
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        weather_cache_file = os.path.join(cache_dir, "weather_cache.sqlite")
+        try:
+            # Weather is shared by both modes and fetched beforehand
+            days = np.arange(
+                start_time.astype("datetime64[D]"),
+                end_time.astype("datetime64[D]") + 1,
+            ).astype(str)
+            prefetch_weather(
+                {
+                    (position["lat"], position["lon"]): days
+                    for position in ground_terminals.values()
+                },
+                url,
+                weather_cache_file,
+            )
+
+            for mode in ("Batched", "Per satellite"):
+                # Every mode starts without cached passes
+                cache_file = os.path.join(cache_dir, f"{mode}.sqlite")
+                # Runs with the satellite ID of their first TLE
+                if mode == "Batched":
+                    runs = [(0, tles)]
+                else:
+                    runs = [(i, [tle]) for i, tle in enumerate(tles)]
+                tracemalloc.start()
+                start = time.perf_counter()
+                passes = []
+                for first_id, run_tles in runs:
+                    satellite_passes = get_quarc_satellite_passes(
+                        ground_terminals,
+                        start_time,
+                        end_time,
+                        step_duration,
+                        min_elevation_angle,
+                        tles=run_tles,
+                        cache_file=cache_file,
+                        weather_url=url,
+                        weather_cache_file=weather_cache_file,
+                    )
+                    passes.extend(
+                        (
+                            first_id + satellite_pass["satelliteId"],
+                            satellite_pass["nodeId"],
+                            satellite_pass["startTime"],
+                            satellite_pass["endTime"],
+                            round(satellite_pass["achievableKeyVolume"], 6),
+                        )
+                        for satellite_pass in satellite_passes
+                    )
+                runtimes[mode] = time.perf_counter() - start
+                peaks[mode] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results[mode] = sorted(passes)
+        finally:
+            server.shutdown()
+
+    print("###### Constellation ######")
+    print("Satellites:", number_satellites, "terminals:", len(ground_terminals))
+    print("Planning horizon:", (end_time - start_time) / np.timedelta64(1, "h"), "h")
+    for mode in runtimes:
+        print(
+            f"{mode}: {runtimes[mode]:.2f}s, peak memory "
+            f"{peaks[mode] / 2**20:.0f} MiB, {len(results[mode])} passes"
+        )
+    print(
+        f"Speedup: {runtimes['Per satellite'] / runtimes['Batched']:.1f}x, "
+        f"same passes: {results['Batched'] == results['Per satellite']}"
+    )
+    print("###########################")
+    return runtimes, peaks
+
+
+# Compares the visible samples of the full elevation matrix with the ground track
+# pre-filter that evaluates only candidate blocks
+def benchmark_prefilter(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    number_satellites=1,
+):
+    tles = (
+        [tle_lines] if number_satellites == 1 else get_synthetic_tles(number_satellites)
+    )
+    time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+    time_offsets = (time_steps - start_time) / np.timedelta64(1, "s")
+    satellite_xyz = get_constellation_propagator(get_satellites(tles), start_time)(
+        time_offsets
+    )
+    terminal_xyz, terminal_up = get_terminal_geometry(ground_terminals)
+
+    runtimes = {}
+    samples = {}
+    for mode, stride in (
+        ("Full", None),
+        ("Pre-filter", max(PREFILTER_STEP // step_duration, 1)),
+    ):
+        start = time.perf_counter()
+        samples[mode] = get_grouped_visible_samples(
+            satellite_xyz,
+            terminal_xyz,
+            terminal_up,
+            min_elevation_angle,
+            prefilter_stride=stride,
+        )
+        runtimes[mode] = time.perf_counter() - start
+
+    same = all(
+        np.array_equal(full, filtered)
+        for full, filtered in zip(samples["Full"][:3], samples["Pre-filter"][:3])
+    )
+    max_deviation = np.max(
+        np.abs(samples["Full"][3] - samples["Pre-filter"][3]), initial=0.0
+    )
+
+    print("###### Pre-filter ######")
+    print("Satellites:", len(tles), "terminals:", len(ground_terminals))
+    print("Samples:", samples["Full"][4], "visible:", len(samples["Full"][0]))
+    print(f"Skipped: {1 - samples['Pre-filter'][4] / samples['Full'][4]:.1%}")
+    for mode, runtime in runtimes.items():
+        print(f"Runtime {mode}: {runtime:.2f}s")
+    print(f"Speedup: {runtimes['Full'] / runtimes['Pre-filter']:.1f}x")
+    print("Same visible samples:", same)
+    print(f"Max elevation deviation: {max_deviation:.2e} deg")
+    print("########################")
+    return runtimes
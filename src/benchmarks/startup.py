@@ -0,0 +1,91 @@
+"""
+Import time and lazy initialization of the generator and solver modules
+"""
+
+import os
+import subprocess
+import sys
+import time
+from ..input.quarc_data_generation import get_timescale
+
+# Cumulative import time budget in seconds per module, as reported by -X importtime.
+# Solver scripts import src.utils, the generator imports the input modules
+IMPORT_TIME_BUDGETS = {
+    "src.utils": 0.1,
+    "src.input.weather": 0.4,
+    "src.input.quarc_data_generation": 1.0,
+}
+
+# The modules are imported as src.* from the repository root
+REPOSITORY_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+def get_import_time(module, repeats=5):
+    # Smallest cumulative import time in seconds over fresh interpreters
+    import_times = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=REPOSITORY_ROOT,
+        )
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if line.startswith("import time:") and fields[-1].strip() == module:
+                import_times.append(int(fields[1]) / 1e6)
+    return min(import_times)
+
+
+def is_initialized_lazily():
+    # Importing the generator in a fresh interpreter creates neither the timescale,
+    # the satellites nor an HTTP session and does not pull in matplotlib
+    lazy_check = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from src.input import quarc_data_generation, weather\n"
+            "print(quarc_data_generation.get_timescale.cache_info().currsize\n"
+            "    + quarc_data_generation.get_satellite.cache_info().currsize\n"
+            "    + len(weather.http_sessions), 'matplotlib' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPOSITORY_ROOT,
+    ).stdout.split()
+    return lazy_check == ["0", "False"]
+
+
+# Checks the import times against IMPORT_TIME_BUDGETS and that importing does not
+# create the timescale, satellites or HTTP session before their first use
+def benchmark_startup(
+    ground_terminals, start_time, end_time, step_duration, min_elevation_angle
+):
+    import_times = {module: get_import_time(module) for module in IMPORT_TIME_BUDGETS}
+    lazy = is_initialized_lazily()
+
+    start = time.perf_counter()
+    get_timescale()
+    first_use_runtime = time.perf_counter() - start
+
+    print("###### Startup ######")
+    for module, import_time in import_times.items():
+        print(
+            f"{module}: {import_time:.3f}s "
+            f"(budget {IMPORT_TIME_BUDGETS[module]:.1f}s)"
+        )
+    print(f"Timescale on first use: {first_use_runtime:.3f}s")
+    print("Nothing initialized at import:", lazy)
+    within_budget = lazy and all(
+        import_time <= IMPORT_TIME_BUDGETS[module]
+        for module, import_time in import_times.items()
+    )
+    print("Within budget:", within_budget)
+    print("#####################")
+    return within_budget
@@ -0,0 +1,125 @@
+"""
+Synthetic ground terminals, constellations and problem instances for the benchmarks
+"""
+
+import os
+import numpy as np
+from ..input.quarc_data_generation import tle_lines
+from ..input.create_problems import get_service_targets, save_problem_instances_to_json
+
+
+def get_synthetic_ground_terminals(number_terminals, seed=0):
+    # Terminals spread uniformly over the globe
+    rng = np.random.default_rng(seed)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, number_terminals)))
+    longitudes = rng.uniform(-180, 180, number_terminals)
+    altitudes = rng.uniform(0, 2000, number_terminals)
+    return {
+        i: {
+            "lat": float(latitudes[i]),
+            "lon": float(longitudes[i]),
+            "alt": float(altitudes[i]),
+        }
+        for i in range(number_terminals)
+    }
+
+
+def get_tle_checksum(line):
+    # Modulo 10 sum of the digits, minus signs count as 1
+    return sum(int(c) if c.isdigit() else c == "-" for c in line[:68]) % 10
+
+
+def get_synthetic_tles(number_satellites, number_planes=5):
+    # Walker-like constellation derived from the QUARC stand-in: the satellites are
+    # spread over number_planes right ascensions and evenly in mean anomaly per plane
+    line1, line2 = tle_lines
+    satellites_per_plane = -(-number_satellites // number_planes)
+    tles = []
+    for i in range(number_satellites):
+        plane, slot = divmod(i, satellites_per_plane)
+        raan = (float(line2[17:25]) + 360 * plane / number_planes) % 360
+        mean_anomaly = (float(line2[43:51]) + 360 * slot / satellites_per_plane) % 360
+        satnum = f"{90000 + i:05d}"
+        new_line1 = line1[:2] + satnum + line1[7:68]
+        new_line2 = (
+            line2[:2]
+            + satnum
+            + line2[7:17]
+            + f"{raan:8.4f}"
+            + line2[25:43]
+            + f"{mean_anomaly:8.4f}"
+            + line2[51:68]
+        )
+        tles.append(
+            [
+                new_line1 + str(get_tle_checksum(new_line1)),
+                new_line2 + str(get_tle_checksum(new_line2)),
+            ]
+        )
+    return tles
+
+
+# Problem instance with one synthetic pass per terminal and orbit, every tenth pass
+# without key volume
+def get_synthetic_problem_instance(
+    ground_terminals, start_time, end_time, number_application_contexts
+):
+    rng = np.random.default_rng(0)
+    orbit_duration = np.timedelta64(5700, "s")
+    satellite_passes = []
+    for node_id in range(len(ground_terminals)):
+        for orbit_id, orbit_start in enumerate(
+            np.arange(start_time, end_time, orbit_duration)
+        ):
+            pass_start = orbit_start + np.timedelta64(int(rng.integers(0, 5000)), "s")
+            key_volume = float(rng.uniform(0, 1e6))
+            satellite_passes.append(
+                {
+                    "id": len(satellite_passes),
+                    "nodeId": node_id,
+                    "startTime": str(pass_start),
+                    "endTime": str(
+                        pass_start + np.timedelta64(int(rng.integers(60, 600)), "s")
+                    ),
+                    "achievableKeyVolume": key_volume if rng.random() > 0.1 else 0.0,
+                    "orbitId": orbit_id,
+                    "satelliteId": 0,
+                }
+            )
+    return {
+        "problem_instance_id": "benchmark",
+        "coverage_start": start_time,
+        "coverage_end": end_time,
+        "min_elevation_angle": 15,
+        "number_satellite_passes": len(satellite_passes),
+        "satellite_passes": satellite_passes,
+        "service_targets": get_service_targets(
+            len(ground_terminals), number_application_contexts
+        ),
+    }
+
+
+def write_synthetic_instances(
+    ground_terminals,
+    start_time,
+    planning_horizons,
+    number_application_contexts,
+    instance_dir,
+):
+    # One JSON instance <planning horizon>h.json per planning horizon in hours
+    instance_files = []
+    for planning_horizon in planning_horizons:
+        json_file = os.path.join(instance_dir, f"{planning_horizon}h.json")
+        save_problem_instances_to_json(
+            [
+                get_synthetic_problem_instance(
+                    ground_terminals,
+                    start_time,
+                    start_time + np.timedelta64(planning_horizon, "h"),
+                    number_application_contexts,
+                )
+            ],
+            json_file,
+        )
+        instance_files.append(json_file)
+    return instance_files
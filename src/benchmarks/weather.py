@@ -0,0 +1,156 @@
+"""
+Benchmarks of the weather retrieval against the local stand-in server
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+from ..input.weather import (
+    request_weather_range,
+    get_daily_weather_records,
+    get_cloud_coverage,
+    get_weather_records,
+    prefetch_weather,
+)
+from .stand_in_weather import start_stand_in_weather_server
+
+
+# Compares one weather request per terminal and day with one range request per
+# terminal, both against a local stand-in server
+def benchmark_weather(
+    ground_terminals, start_time, end_time, step_duration, min_elevation_angle
+):
+    server, url = start_stand_in_weather_server()
+    dates = [
+        str(date)
+        for date in np.arange(
+            start_time.astype("datetime64[D]"),
+            (end_time - np.timedelta64(1, "s")).astype("datetime64[D]") + 1,
+        )
+    ]
+    positions = list(ground_terminals.values())
+
+    start = time.perf_counter()
+    per_day_coverage = []
+    for position in positions:
+        for date in dates:
+            data = request_weather_range(
+                position["lat"], position["lon"], date, date, url
+            )
+            records = get_daily_weather_records(position["lat"], position["lon"], data)
+            per_day_coverage.append(records[date]["cloud_coverage_fraction"])
+    per_day_runtime = time.perf_counter() - start
+    per_day_requests = server.request_count
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = os.path.join(cache_dir, "weather_cache.sqlite")
+
+        server.request_count = 0
+        start = time.perf_counter()
+        range_coverage = []
+        for position in positions:
+            fractions = get_cloud_coverage(
+                position["lat"], position["lon"], dates, url, cache_file
+            )
+            range_coverage.extend(fractions[date] for date in dates)
+        range_runtime = time.perf_counter() - start
+        range_requests = server.request_count
+
+        # Later single-day lookups are answered from the cached ranges
+        server.request_count = 0
+        start = time.perf_counter()
+        for position in positions:
+            for date in dates:
+                get_weather_records(
+                    position["lat"], position["lon"], [date], url, cache_file
+                )
+        cached_runtime = time.perf_counter() - start
+        cached_requests = server.request_count
+    server.shutdown()
+
+    print("###### Weather ######")
+    print("Terminals:", len(positions))
+    print("Days:", len(dates))
+    print(f"Per day: {per_day_requests} requests, {per_day_runtime:.2f}s")
+    print(f"Per terminal range: {range_requests} requests, {range_runtime:.2f}s")
+    print(
+        f"Cached single-day lookups: {cached_requests} requests, {cached_runtime:.2f}s"
+    )
+    print(
+        "Max cloud coverage deviation:",
+        np.max(np.abs(np.array(per_day_coverage) - np.array(range_coverage))),
+    )
+    print("#####################")
+    return per_day_runtime, range_runtime
+
+
+# Compares serial weather retrieval with the concurrent prefetch against a stand-in
+# server that answers with latency and rejects more than requests_per_second
+def benchmark_weather_prefetch(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    latency=0.2,
+    requests_per_second=20,
+):
+    dates = [
+        str(date)
+        for date in np.arange(
+            start_time.astype("datetime64[D]"),
+            (end_time - np.timedelta64(1, "s")).astype("datetime64[D]") + 1,
+        )
+    ]
+    location_dates = {
+        (position["lat"], position["lon"]): dates
+        for position in ground_terminals.values()
+    }
+
+    def run(fetch):
+        server, url = start_stand_in_weather_server(latency, requests_per_second)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_file = os.path.join(cache_dir, "weather_cache.sqlite")
+            start = time.perf_counter()
+            fetch(url, cache_file)
+            runtime = time.perf_counter() - start
+            coverage = [
+                get_cloud_coverage(latitude, longitude, dates, url, cache_file)
+                for latitude, longitude in location_dates
+            ]
+        server.shutdown()
+        return runtime, server.request_count, server.rate_limited_count, coverage
+
+    def fetch_serial(url, cache_file):
+        for latitude, longitude in location_dates:
+            get_weather_records(latitude, longitude, dates, url, cache_file)
+
+    # Within the server limit and far above it, the latter has to back off on 429
+    requests_per_minute = requests_per_second * 60
+    results = {
+        "Serial": run(fetch_serial),
+        f"Prefetch {requests_per_minute // 2}/min": run(
+            lambda url, cache_file: prefetch_weather(
+                location_dates, url, cache_file, requests_per_minute // 2
+            )
+        ),
+        f"Prefetch {requests_per_minute * 5}/min": run(
+            lambda url, cache_file: prefetch_weather(
+                location_dates, url, cache_file, requests_per_minute * 5
+            )
+        ),
+    }
+
+    print("###### Weather prefetch ######")
+    print("Locations:", len(location_dates))
+    print(f"Server: {latency * 1000:.0f}ms latency, {requests_per_second} requests/s")
+    reference = results["Serial"][3]
+    for name, (runtime, request_count, rate_limited_count, coverage) in results.items():
+        print(
+            f"{name}: {runtime:.2f}s, {request_count} requests, "
+            f"{rate_limited_count} rate limited, same cloud coverage: "
+            f"{coverage == reference}"
+        )
+    print("##############################")
+    return {name: result[0] for name, result in results.items()}
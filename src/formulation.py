@@ -0,0 +1,210 @@
+"""
+Sparse matrices of the satellite pass assignment model
+
+Builds the formulation of create_problems.build_model from the columnar instance
+(see instance_format) with numpy and SciPy instead of one Python object per variable
+and row: the objective vector, the pass and target assignment rows and the big-M
+non-overlap rows as CSR matrices over the x_i_j variables.
+
+The non-overlap rows come in two formulations: "bigm", one big-M row per pair of
+conflicting passes, and "clique", one row per maximal clique of the conflict graph
+that allows at most one of its passes to be assigned. Only passes of the same
+satellite conflict.
+"""
+
+import numpy as np
+from scipy import sparse
+from .utils import get_conflict_cliques
+
+T_MIN = 60  # Minimum time between consecutive contacts in seconds
+BIG_M = 99999
+CONFLICT_FORMULATIONS = ("bigm", "clique")
+
+
+def get_assignment_arrays(pass_nodes, pass_zero_volume, target_nodes, target_qkd):
+    # Pass and target positions of the decision variables, ordered by pass and then
+    # target like utils.get_assignment_pairs: targets are sorted by node, every pass
+    # takes the range of targets at its node
+    target_order = np.argsort(target_nodes, kind="stable")
+    sorted_nodes = target_nodes[target_order]
+    first = np.searchsorted(sorted_nodes, pass_nodes, side="left")
+    counts = np.searchsorted(sorted_nodes, pass_nodes, side="right") - first
+    pass_index = np.repeat(np.arange(len(pass_nodes)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    target_index = target_order[np.repeat(first, counts) + offsets]
+
+    # No QKD on passes without key volume
+    keep = ~(pass_zero_volume[pass_index] & target_qkd[target_index])
+    return pass_index[keep], target_index[keep]
+
+
+def get_conflict_arrays(ti, di, T_min=T_MIN, si=None):
+    # Pass pairs (i1, i2) of the non-overlap rows: i2 starts after i1 in start time
+    # order and less than T_min after the end of i1, and both belong to the same
+    # satellite of si (all passes by default). Same pairs and order as the loop over
+    # sorted_V in the builders
+    sorted_V = np.argsort(ti, kind="stable")
+    sorted_ti = ti[sorted_V]
+    first = np.arange(1, len(ti) + 1)
+    end = np.maximum(
+        np.searchsorted(sorted_ti, sorted_ti + di[sorted_V] + T_min, side="left"), first
+    )
+    counts = end - first
+    positions = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(
+        counts.sum()
+    )
+    i1, i2 = np.repeat(sorted_V, counts), sorted_V[positions]
+    if si is not None:
+        same_satellite = si[i1] == si[i2]
+        i1, i2 = i1[same_satellite], i2[same_satellite]
+    return i1, i2
+
+
+def get_model_matrices(
+    problem_instance, T_min=T_MIN, big_m=BIG_M, conflict_formulation="bigm"
+):
+    """
+    Returns the model of a columnar instance as a dict: "pass_index" and
+    "target_index" of the variables, "names", "objective" (maximized), the CSR
+    matrices "pass_rows" and "target_rows" (<= 1) and "conflict_rows" with
+    "conflict_sense" and "conflict_rhs". A big-M non-overlap row
+        ti[i1] + di[i1] + T_min <= ti[i2] + (2 - assigned[i1] - assigned[i2]) * M
+    is stored as
+        -M * assigned[i1] - M * assigned[i2] >= ti[i1] + di[i1] + T_min - ti[i2] - 2M
+    and a clique row as
+        sum(assigned[i] for i in clique) <= 1
+    """
+    passes = problem_instance["satellite_passes"]
+    targets = problem_instance["service_targets"]
+    reference_time = np.datetime64(problem_instance["coverage_start"], "s").astype(
+        np.int64
+    )
+    ti = (np.asarray(passes["startTime"]) - reference_time).astype(float)
+    di = (np.asarray(passes["endTime"]) - np.asarray(passes["startTime"])).astype(float)
+    bi = np.asarray(passes["achievableKeyVolume"])
+    # Instances written before multi-satellite support have one satellite
+    si = np.asarray(passes.get("satelliteId", np.zeros(len(ti), dtype=np.int32)))
+    pj = np.asarray(targets["priority"])
+    operations = problem_instance["requested_operations"]
+    mj = (np.asarray(targets["requestedOperation"]) == operations.index("QKD")).astype(
+        float
+    )
+
+    pass_index, target_index = get_assignment_arrays(
+        np.asarray(passes["nodeId"]), bi == 0.0, np.asarray(targets["nodeId"]), mj == 1
+    )
+    number_variables = len(pass_index)
+    columns = np.arange(number_variables)
+    ones = np.ones(number_variables)
+    pass_rows = sparse.csr_matrix(
+        (ones, (pass_index, columns)), shape=(len(ti), number_variables)
+    )
+    target_rows = sparse.csr_matrix(
+        (ones, (target_index, columns)), shape=(len(pj), number_variables)
+    )
+
+    if conflict_formulation == "clique":
+        cliques = get_conflict_cliques(
+            dict(enumerate(ti.tolist())),
+            dict(enumerate(di.tolist())),
+            T_min,
+            dict(enumerate(si.tolist())),
+        )
+        conflict_passes = sparse.csr_matrix(
+            (
+                np.ones(sum(map(len, cliques))),
+                np.concatenate([[]] + cliques).astype(np.int64),
+                np.cumsum([0] + list(map(len, cliques))),
+            ),
+            shape=(len(cliques), len(ti)),
+        )
+        conflict_sense = "<"
+        conflict_rhs = np.ones(len(cliques))
+    else:
+        # Every non-overlap row holds the variables of both passes
+        i1, i2 = get_conflict_arrays(ti, di, T_min, si)
+        conflict_passes = sparse.csr_matrix(
+            (
+                np.full(2 * len(i1), -float(big_m)),
+                (np.tile(np.arange(len(i1)), 2), np.concatenate([i1, i2])),
+            ),
+            shape=(len(i1), len(ti)),
+        )
+        conflict_sense = ">"
+        conflict_rhs = ti[i1] + di[i1] + T_min - ti[i2] - 2 * big_m
+
+    return {
+        "pass_index": pass_index,
+        "target_index": target_index,
+        "names": [
+            f"x_{i}_{j}" for i, j in zip(pass_index.tolist(), target_index.tolist())
+        ],
+        "objective": pj[target_index] * (1 + bi[pass_index] * mj[target_index]),
+        "pass_rows": pass_rows,
+        "target_rows": target_rows,
+        "conflict_rows": (conflict_passes @ pass_rows).tocsr(),
+        "conflict_sense": conflict_sense,
+        "conflict_rhs": conflict_rhs,
+    }
+
+
+def build_model_matrix(
+    problem_instance, T_min=T_MIN, big_m=BIG_M, conflict_formulation="bigm"
+):
+    # Creates the Gurobi model with the matrix API, one call per block of rows
+    from gurobipy import Model, GRB
+
+    matrices = get_model_matrices(problem_instance, T_min, big_m, conflict_formulation)
+    model = Model("Satellite Optimization")
+    x = model.addMVar(
+        len(matrices["names"]),
+        vtype=GRB.BINARY,
+        name=np.array(matrices["names"], dtype=object),
+    )
+    model.setObjective(matrices["objective"] @ x, GRB.MAXIMIZE)
+
+    # Constraints: each pass and each target at most once
+    for rows in (matrices["pass_rows"], matrices["target_rows"]):
+        model.addMConstr(rows, x, GRB.LESS_EQUAL, np.ones(rows.shape[0]))
+
+    # Non-overlapping satellite passes
+    model.addMConstr(
+        matrices["conflict_rows"],
+        x,
+        matrices["conflict_sense"],
+        matrices["conflict_rhs"],
+    )
+    model.update()
+    return model
+
+
+def build_scip_model(matrices):
+    # SCIP has no matrix API, the rows are added one by one from the CSR matrices
+    from pyscipopt import Model, quicksum
+
+    model = Model("Satellite Optimization")
+    x = [model.addVar(vtype="B", name=name) for name in matrices["names"]]
+    model.setObjective(
+        quicksum(c * x[k] for k, c in enumerate(matrices["objective"].tolist())),
+        "maximize",
+    )
+    blocks = [
+        (matrices["pass_rows"], "<", np.ones(matrices["pass_rows"].shape[0])),
+        (matrices["target_rows"], "<", np.ones(matrices["target_rows"].shape[0])),
+        (
+            matrices["conflict_rows"],
+            matrices["conflict_sense"],
+            matrices["conflict_rhs"],
+        ),
+    ]
+    for rows, sense, rhs in blocks:
+        for r, value in enumerate(rhs.tolist()):
+            start, end = rows.indptr[r], rows.indptr[r + 1]
+            expr = quicksum(
+                c * x[k]
+                for k, c in zip(
+                    rows.indices[start:end].tolist(), rows.data[start:end].tolist()
+                )
+            )
+            model.addCons(expr <= value if sense == "<" else expr >= value)
+    return model
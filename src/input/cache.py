@@ -0,0 +1,147 @@
+"""
+Key-value cache in SQLite (WAL mode) that can be shared by many processes
+"""
+
+import os
+import json
+import time
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Variable limit per statement of older SQLite versions
+SQLITE_BATCH_SIZE = 500
+
+# Entries written by a process between two checks of the entry count
+EVICTION_INTERVAL = 1000
+
+
+def encode_cache_key(key):
+    # Typed keys are tuples of plain values, stored as canonical JSON text
+    return json.dumps(key, separators=(",", ":"), default=str)
+
+
+class SQLiteCache:
+    """
+    Cache with typed tuple keys and pickled values. Each thread of each process keeps
+    one connection, so instances can be used from threads and forked processes; WAL
+    mode lets readers proceed while another process writes. Entries older than
+    max_age (seconds) are evicted on every write. The entry count is checked after
+    every eviction_interval written entries, so a cache can exceed max_entries by
+    that many per process before its oldest entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_entries=None,
+        max_age=None,
+        eviction_interval=EVICTION_INTERVAL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.eviction_interval = eviction_interval
+        self.hits = 0
+        self.misses = 0
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_created ON cache (created)"
+            )
+
+    def get_connection(self):
+        # Connections are created on first use per thread, forked workers must not
+        # use the connection of their parent
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=60)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+            self.local.unchecked_writes = 0
+        return self.local.connection
+
+    @contextmanager
+    def connect(self):
+        # Runs the statements of a block in one transaction
+        connection = self.get_connection()
+        with connection:
+            yield connection
+
+    def get_many(self, keys):
+        # Dict of the cached values for the keys that are present
+        encoded = {encode_cache_key(key): key for key in keys}
+        values = {}
+        texts = list(encoded)
+        with self.connect() as connection:
+            for i in range(0, len(texts), SQLITE_BATCH_SIZE):
+                batch = texts[i : i + SQLITE_BATCH_SIZE]
+                rows = connection.execute(
+                    "SELECT key, value FROM cache WHERE key IN "
+                    f"({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for text, value in rows:
+                    values[encoded[text]] = pickle.loads(value)
+        self.hits += len(values)
+        self.misses += len(encoded) - len(values)
+        return values
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items):
+        # Stores a dict of key -> value, replacing existing entries
+        now = time.time()
+        with self.connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                [
+                    (encode_cache_key(key), pickle.dumps(value), now)
+                    for key, value in items.items()
+                ],
+            )
+            self.local.unchecked_writes += len(items)
+            self.evict(
+                connection,
+                check_count=self.local.unchecked_writes >= self.eviction_interval,
+            )
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def evict(self, connection=None, check_count=True):
+        # Removes entries older than max_age and the oldest beyond max_entries. Both
+        # deletes only visit the evicted entries through the index on created
+        if self.max_age is None and self.max_entries is None:
+            return
+        if connection is None:
+            with self.connect() as connection:
+                return self.evict(connection, check_count)
+        if self.max_age is not None:
+            connection.execute(
+                "DELETE FROM cache WHERE created < ?", (time.time() - self.max_age,)
+            )
+        if self.max_entries is not None and check_count:
+            self.local.unchecked_writes = 0
+            count = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_entries:
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY created LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def __len__(self):
+        with self.connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
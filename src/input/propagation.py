@@ -0,0 +1,483 @@
+"""
+Batched satellite propagation and elevation geometry for many ground terminals
+"""
+
+import atexit
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sgp4.api import SatrecArray, jday, SGP4_ERRORS
+from skyfield.api import iers2010
+from skyfield.framelib import itrs
+
+DAY_S = 86400.0
+
+# Julian date of J2000
+T0 = 2451545.0
+
+# Terminal-satellite pairs per elevation matrix, bounds the (pairs x time steps) work
+# arrays
+TERMINAL_GROUP_SIZE = 1000
+
+# Extra central angle (degrees) on top of the bound of the pre-filter, covers rounding
+PREFILTER_MARGIN = 0.1
+
+# Elevation (degrees) below the mask up to which samples of the elevation matrix are
+# recomputed pointwise, covers the rounding of its expanded slant range
+ELEVATION_TOLERANCE = 1e-6
+
+# Process pools by number of workers, created on first use and reused across calls
+# until shutdown_process_pools
+process_pools = {}
+
+
+def get_terminal_geometry(ground_terminals):
+    # Earth-fixed positions (km) and local zenith unit vectors of all terminals, shape (3, N)
+    positions = list(ground_terminals.values())
+    lat = np.array([p["lat"] for p in positions], dtype=float)
+    lon = np.array([p["lon"] for p in positions], dtype=float)
+    alt = np.array([p["alt"] for p in positions], dtype=float)
+
+    # Same ellipsoid as skyfield.api.Topos used by the per-terminal engines
+    terminal_xyz = iers2010.latlon(lat, lon, elevation_m=alt).itrs_xyz.km
+
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    terminal_up = np.array(
+        [
+            np.cos(lat_rad) * np.cos(lon_rad),
+            np.cos(lat_rad) * np.sin(lon_rad),
+            np.sin(lat_rad),
+        ]
+    )
+    return terminal_xyz.reshape(3, -1), terminal_up
+
+
+def propagate_satellite_itrs(satellite, skyfield_times):
+    # Earth-fixed satellite positions (km) for the whole time grid, shape (3, T)
+    return satellite.at(skyfield_times).frame_xyz(itrs).km
+
+
+def get_utc_components(time):
+    # Year, month, day, hour, minute and second (with its fraction) of a numpy
+    # datetime64 of any unit
+    seconds = time.astype("datetime64[s]")
+    calendar = seconds.astype(datetime)
+    fraction = float((time - seconds) / np.timedelta64(1, "s"))
+    return (
+        calendar.year,
+        calendar.month,
+        calendar.day,
+        calendar.hour,
+        calendar.minute,
+        calendar.second + fraction,
+    )
+
+
+def get_gmst_1982(jd_ut1, fraction_ut1):
+    # Greenwich mean sidereal angle (radians) that rotates TEME into the Earth-fixed frame
+    t = (jd_ut1 - T0 + fraction_ut1) / 36525.0
+    g = 67310.54841 + (8640184.812866 + (0.093104 + (-6.2e-6) * t) * t) * t
+    return (jd_ut1 % 1.0 + fraction_ut1 + g / DAY_S % 1.0) % 1.0 * 2 * np.pi
+
+
+def make_sgp4_propagator(satrecs, start_time, dut1=0.0):
+    """
+    Returns a function that maps seconds since start_time (numpy datetime64) to
+    Earth-fixed satellite positions in km, using the sgp4 array API directly
+    instead of Skyfield objects. With a single satellite the shape is (3, M).
+    dut1 (UT1 - UTC in seconds) is assumed constant over the planning horizon.
+    Polar motion is neglected, as in the Skyfield path. Raises ValueError if SGP4
+    fails for any satellite and offset, e.g. for a decayed element set.
+    """
+    satrecs = list(satrecs)
+    satellites = SatrecArray(satrecs)
+    jd, fraction = jday(*get_utc_components(start_time))
+
+    def propagate(offsets):
+        offsets = np.asarray(offsets, dtype=float)
+        fractions = fraction + offsets / DAY_S
+        jds = np.full(len(fractions), jd)
+        error, position, velocity = satellites.sgp4(jds, fractions)
+
+        # Failed samples come back as NaN positions with an error code
+        failed_satellites, failed_steps = np.nonzero(error)
+        if len(failed_satellites) > 0:
+            satellite, step = failed_satellites[0], failed_steps[0]
+            raise ValueError(
+                f"SGP4 failed for satellite {satrecs[satellite].satnum} at "
+                f"{offsets[step]:.0f}s after {start_time}: "
+                f"{SGP4_ERRORS.get(int(error[satellite, step]), 'unknown error')}"
+            )
+
+        # TEME -> Earth-fixed rotation about the z-axis by GMST
+        theta = get_gmst_1982(jds, fractions + dut1 / DAY_S)
+        cos_theta = np.cos(theta)
+        sin_theta = np.sin(theta)
+        x = cos_theta * position[..., 0] + sin_theta * position[..., 1]
+        y = -sin_theta * position[..., 0] + cos_theta * position[..., 1]
+        positions = np.stack([x, y, position[..., 2]], axis=-2)
+        return positions[0] if len(satrecs) == 1 else positions
+
+    return propagate
+
+
+def get_elevation_matrix(satellite_xyz, terminal_xyz, terminal_up):
+    # Elevation angles in degrees for every terminal and time step, shape (N, T)
+    up_dot_satellite = terminal_up.T @ satellite_xyz
+    up_dot_terminal = np.einsum("ij,ij->j", terminal_up, terminal_xyz)
+    terminal_dot_satellite = terminal_xyz.T @ satellite_xyz
+
+    # |satellite - terminal|^2 expanded to avoid a (3, N, T) difference array
+    squared_range = (
+        np.einsum("ij,ij->j", satellite_xyz, satellite_xyz)[np.newaxis, :]
+        - 2 * terminal_dot_satellite
+        + np.einsum("ij,ij->j", terminal_xyz, terminal_xyz)[:, np.newaxis]
+    )
+    sin_elevation = (up_dot_satellite - up_dot_terminal[:, np.newaxis]) / np.sqrt(
+        squared_range
+    )
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+
+def get_candidate_blocks(
+    satellite_xyz, terminal_xyz, terminal_up, min_elevation_angle, stride
+):
+    """
+    Pre-filter on the sub-satellite ground track. The time grid of positions
+    (S, 3, T) is split into blocks of stride steps, a block is a candidate for a
+    terminal if the central angle between the terminal and the sub-satellite point
+    at its first step is within the largest angle at which the satellite can be
+    seen above min_elevation_angle (the maximum slant range), widened by the
+    distance the ground track moves within a block. Returns a boolean mask of shape
+    (N, S, blocks).
+    """
+    terminal_radius = np.linalg.norm(terminal_xyz, axis=0)
+    terminal_direction = terminal_xyz / terminal_radius
+    satellite_radius = np.linalg.norm(satellite_xyz, axis=1)
+    track = satellite_xyz / satellite_radius[:, np.newaxis, :]
+
+    # The geodetic zenith is tilted against the geocentric direction, so the geocentric
+    # elevation of a visible satellite can be lower than min_elevation_angle by the tilt
+    tilt = np.arccos(
+        np.clip(np.einsum("ij,ij->j", terminal_up, terminal_direction), -1.0, 1.0)
+    )
+    elevation = np.radians(min_elevation_angle) - tilt
+
+    # Largest central angle with the satellite above the mask, per terminal and
+    # satellite, from the law of sines in the triangle Earth center, terminal, satellite
+    max_central_angle = (
+        np.arccos(
+            np.clip(
+                (terminal_radius * np.cos(elevation))[:, np.newaxis]
+                / satellite_radius.max(axis=1)[np.newaxis, :],
+                -1.0,
+                1.0,
+            )
+        )
+        - elevation[:, np.newaxis]
+    )
+
+    # Angle the sub-satellite point moves from the first to the last step of a block
+    step_angles = np.arccos(
+        np.clip(np.einsum("sit,sit->st", track[:, :, :-1], track[:, :, 1:]), -1.0, 1.0)
+    )
+    block_motion = (stride - 1) * np.max(step_angles, axis=1, initial=0.0)
+
+    threshold = np.cos(
+        np.minimum(
+            max_central_angle
+            + block_motion[np.newaxis, :]
+            + np.radians(PREFILTER_MARGIN),
+            np.pi,
+        )
+    )
+    cos_central_angle = (
+        terminal_direction.T @ np.concatenate(track[:, :, ::stride], axis=1)
+    ).reshape(len(terminal_radius), len(satellite_xyz), -1)
+    return cos_central_angle >= threshold[:, :, np.newaxis]
+
+
+def get_visible_samples(
+    satellite_xyz,
+    terminal_xyz,
+    terminal_up,
+    min_elevation_angle,
+    prefilter_stride=None,
+):
+    # Terminal indices, satellite indices, time step indices and elevations of all
+    # samples at or above min_elevation_angle, ordered by terminal, satellite and time,
+    # and the number of evaluated samples. Without pre-filter the positions of all
+    # satellites (S, 3, T) are evaluated in one elevation matrix, with pre-filter only
+    # the samples of candidate blocks are evaluated. Both decide on the pointwise
+    # elevations, so samples on the mask are kept by either
+    number_satellites, _, number_steps = satellite_xyz.shape
+    if prefilter_stride is None:
+        elevation_matrix = get_elevation_matrix(
+            np.concatenate(satellite_xyz, axis=1), terminal_xyz, terminal_up
+        ).reshape(-1, number_satellites, number_steps)
+        terminals, satellites, steps = np.nonzero(
+            elevation_matrix >= min_elevation_angle - ELEVATION_TOLERANCE
+        )
+        evaluated = elevation_matrix.size
+    else:
+        terminals, satellites, blocks = np.nonzero(
+            get_candidate_blocks(
+                satellite_xyz,
+                terminal_xyz,
+                terminal_up,
+                min_elevation_angle,
+                prefilter_stride,
+            )
+        )
+        first_steps = blocks * prefilter_stride
+        block_lengths = np.minimum(prefilter_stride, number_steps - first_steps)
+        terminals = np.repeat(terminals, block_lengths)
+        satellites = np.repeat(satellites, block_lengths)
+        steps = np.repeat(first_steps, block_lengths) + (
+            np.arange(block_lengths.sum())
+            - np.repeat(np.cumsum(block_lengths) - block_lengths, block_lengths)
+        )
+        evaluated = len(terminals)
+
+    elevations = get_pointwise_elevations(
+        satellite_xyz[satellites, :, steps].T,
+        terminal_xyz[:, terminals],
+        terminal_up[:, terminals],
+    )
+    visible = elevations >= min_elevation_angle
+    return (
+        terminals[visible],
+        satellites[visible],
+        steps[visible],
+        elevations[visible],
+        evaluated,
+    )
+
+
+def get_process_pool(workers):
+    if workers not in process_pools:
+        process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return process_pools[workers]
+
+
+def shutdown_process_pools():
+    # Stops the worker processes, later calls with workers > 1 start new pools
+    for pool in process_pools.values():
+        pool.shutdown()
+    process_pools.clear()
+
+
+# Pools of callers that do not shut them down themselves are stopped at exit
+atexit.register(shutdown_process_pools)
+
+
+def get_grouped_visible_samples(
+    satellite_xyz,
+    terminal_xyz,
+    terminal_up,
+    min_elevation_angle,
+    workers=1,
+    group_size=TERMINAL_GROUP_SIZE,
+    prefilter_stride=None,
+):
+    """
+    Same result as get_visible_samples, evaluated in contiguous groups of terminals
+    with at most group_size terminal-satellite pairs. With workers > 1 the groups are
+    spread over worker processes, which only send back their visible samples.
+    Concatenating the groups in order keeps the terminal-major order and thus the
+    pass IDs. prefilter_stride enables the ground track pre-filter with blocks of
+    that many time steps.
+    """
+    number_terminals = terminal_xyz.shape[1]
+    terminals_per_group = max(group_size // len(satellite_xyz), 1)
+    number_groups = max(
+        -(-number_terminals // terminals_per_group),
+        min(workers, number_terminals),
+        1,
+    )
+    bounds = np.linspace(0, number_terminals, number_groups + 1).astype(int)
+    groups = list(zip(bounds[:-1], bounds[1:]))
+    arguments = (
+        [satellite_xyz] * len(groups),
+        [terminal_xyz[:, first:last] for first, last in groups],
+        [terminal_up[:, first:last] for first, last in groups],
+        [min_elevation_angle] * len(groups),
+        [prefilter_stride] * len(groups),
+    )
+    if workers > 1 and len(groups) > 1:
+        results = list(get_process_pool(workers).map(get_visible_samples, *arguments))
+    else:
+        results = list(map(get_visible_samples, *arguments))
+
+    terminals = np.concatenate(
+        [result[0] + first for result, (first, _) in zip(results, groups)]
+    )
+    satellites = np.concatenate([result[1] for result in results])
+    steps = np.concatenate([result[2] for result in results])
+    elevations = np.concatenate([result[3] for result in results])
+    evaluated = sum(result[4] for result in results)
+    return terminals, satellites, steps, elevations, evaluated
+
+
+def get_pointwise_elevations(satellite_xyz, terminal_xyz, terminal_up):
+    # Elevation angles in degrees for matching columns of satellite and terminal arrays
+    difference = satellite_xyz - terminal_xyz
+    sin_elevation = np.einsum("ij,ij->j", difference, terminal_up) / np.linalg.norm(
+        difference, axis=0
+    )
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+
+def get_interpolated_propagator(propagate, duration, node_step=60):
+    """
+    Propagates once on a grid of node_step seconds that covers [0, duration] and
+    returns a function with the signature of propagate that interpolates the
+    positions between the nodes with cubic Lagrange polynomials over the four
+    surrounding nodes. At a 60 s node step the error for LEO orbits is a few
+    meters, a few 1e-4 degrees of elevation.
+    """
+    # Node k is at (k - 1) * node_step, so every offset has a node on either side
+    node_offsets = node_step * np.arange(-1, np.ceil(duration / node_step) + 3)
+    node_positions = propagate(node_offsets)
+
+    def interpolate(offsets):
+        u = np.asarray(offsets, dtype=float) / node_step + 1
+        first = np.clip(np.floor(u).astype(int) - 1, 0, len(node_offsets) - 4)
+        s = u - first
+        weights = (
+            -(s - 1) * (s - 2) * (s - 3) / 6,
+            s * (s - 2) * (s - 3) / 2,
+            -s * (s - 1) * (s - 3) / 2,
+            s * (s - 1) * (s - 2) / 6,
+        )
+        return sum(
+            weight * node_positions[..., first + k] for k, weight in enumerate(weights)
+        )
+
+    return interpolate
+
+
+def find_visibility_windows(
+    propagate,
+    terminal_xyz,
+    terminal_up,
+    duration,
+    min_elevation_angle,
+    coarse_step=60,
+    tolerance=0.01,
+    peak_margin=5,
+    peak_tolerance=1,
+):
+    """
+    Finds the time windows in which each terminal sees the satellite above
+    min_elevation_angle. The elevation is scanned on a coarse grid and rise/set
+    times are refined by bisection, similar to Skyfield's find_events.
+    propagate maps seconds since the window start to Earth-fixed positions (3, M),
+    the refinement evaluates it many times, so it should be cheap (see
+    get_interpolated_propagator). Returns terminal indices, rise offsets and set
+    offsets (in seconds).
+    """
+
+    def elevation_margin(terminal_indices, offsets):
+        # Many terminals share crossing times, so each instant is propagated once
+        unique_offsets, inverse = np.unique(offsets, return_inverse=True)
+        elevations = get_pointwise_elevations(
+            propagate(unique_offsets)[:, inverse],
+            terminal_xyz[:, terminal_indices],
+            terminal_up[:, terminal_indices],
+        )
+        return elevations - min_elevation_angle
+
+    coarse_offsets = np.append(np.arange(0, duration, coarse_step), duration)
+    margin = (
+        get_elevation_matrix(propagate(coarse_offsets), terminal_xyz, terminal_up)
+        - min_elevation_angle
+    )
+    visible = margin >= 0
+
+    # Brackets where the visibility changes between two coarse samples
+    rise_terminals, rise_steps = np.nonzero(~visible[:, :-1] & visible[:, 1:])
+    set_terminals, set_steps = np.nonzero(visible[:, :-1] & ~visible[:, 1:])
+    lower = np.concatenate([coarse_offsets[rise_steps], coarse_offsets[set_steps]])
+    upper = np.concatenate(
+        [coarse_offsets[rise_steps + 1], coarse_offsets[set_steps + 1]]
+    )
+    terminals = np.concatenate([rise_terminals, set_terminals])
+    rising = np.concatenate(
+        [np.ones(len(rise_terminals), bool), np.zeros(len(set_terminals), bool)]
+    )
+
+    # Short passes can rise and set between two coarse samples. Refine every local
+    # maximum less than peak_margin degrees below the mask by golden-section search
+    # and bracket both crossings around the peak if it reaches the mask. At a 60 s
+    # coarse step the true peak of a LEO pass exceeds the best sample by ~1.2 deg.
+    peak_terminals, peak_steps = np.nonzero(
+        (margin[:, 1:-1] >= margin[:, :-2])
+        & (margin[:, 1:-1] > margin[:, 2:])
+        & ~visible[:, 1:-1]
+        & (margin[:, 1:-1] > -peak_margin)
+    )
+    if len(peak_terminals) > 0:
+        left = coarse_offsets[peak_steps]
+        right = coarse_offsets[peak_steps + 2]
+        ratio = (np.sqrt(5) - 1) / 2
+        while np.max(right - left) > peak_tolerance:
+            inner_left = right - ratio * (right - left)
+            inner_right = left + ratio * (right - left)
+            inner_margin = elevation_margin(
+                np.concatenate([peak_terminals, peak_terminals]),
+                np.concatenate([inner_left, inner_right]),
+            )
+            move_left = (
+                inner_margin[: len(peak_terminals)]
+                < inner_margin[len(peak_terminals) :]
+            )
+            left = np.where(move_left, inner_left, left)
+            right = np.where(move_left, right, inner_right)
+        peak = (left + right) / 2
+        reaches_mask = elevation_margin(peak_terminals, peak) >= 0
+
+        peak_terminals = peak_terminals[reaches_mask]
+        peak = peak[reaches_mask]
+        peak_steps = peak_steps[reaches_mask]
+        lower = np.concatenate([lower, coarse_offsets[peak_steps], peak])
+        upper = np.concatenate([upper, peak, coarse_offsets[peak_steps + 2]])
+        terminals = np.concatenate([terminals, peak_terminals, peak_terminals])
+        rising = np.concatenate(
+            [
+                rising,
+                np.ones(len(peak_terminals), bool),
+                np.zeros(len(peak_terminals), bool),
+            ]
+        )
+
+    # Bisection on the elevation margin; lower stays invisible for rising and
+    # visible for setting crossings (and vice versa for upper)
+    while len(terminals) > 0 and np.max(upper - lower) > tolerance:
+        middle = (lower + upper) / 2
+        middle_visible = elevation_margin(terminals, middle) >= 0
+        move_upper = middle_visible == rising
+        upper = np.where(move_upper, middle, upper)
+        lower = np.where(move_upper, lower, middle)
+    crossings = np.where(rising, upper, lower)
+
+    # Terminals that already see the satellite at the window borders
+    start_visible = np.flatnonzero(visible[:, 0])
+    end_visible = np.flatnonzero(visible[:, -1])
+    rise_terminals = np.concatenate([start_visible, terminals[rising]])
+    rise_offsets = np.concatenate([np.zeros(len(start_visible)), crossings[rising]])
+    set_terminals = np.concatenate([terminals[~rising], end_visible])
+    set_offsets = np.concatenate(
+        [crossings[~rising], np.full(len(end_visible), float(duration))]
+    )
+
+    # Rise and set events alternate per terminal, so pairing them in sorted order
+    # yields the windows
+    rise_order = np.lexsort((rise_offsets, rise_terminals))
+    set_order = np.lexsort((set_offsets, set_terminals))
+    return (
+        rise_terminals[rise_order],
+        rise_offsets[rise_order],
+        set_offsets[set_order],
+    )
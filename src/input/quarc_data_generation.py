@@ -2,41 +2,63 @@
 Creation of satellite passes over ground terminals
 """
 
-import time
 from skyfield.api import Topos, load, EarthSatellite
 from skyfield.elementslib import osculating_elements_of
 import numpy as np
 import pandas as pd
-from datetime import datetime
-import requests
-import shelve
-import pickle
-import hashlib
-from filelock import FileLock
-from functools import wraps
+from functools import lru_cache
+from ..utils import timed_stage
+from .cache import SQLiteCache
+from .weather import get_cloud_coverage, prefetch_weather
+from .propagation import (
+    get_terminal_geometry,
+    propagate_satellite_itrs,
+    get_elevation_matrix,
+    get_grouped_visible_samples,
+    get_pointwise_elevations,
+    find_visibility_windows,
+    get_interpolated_propagator,
+    get_utc_components,
+    make_sgp4_propagator,
+    shutdown_process_pools,
+)
 
 
 class SatellitePass:
-    def __init__(self, id, nodeId, startTime, endTime, achievableKeyVolume, orbitId):
+    def __init__(
+        self,
+        id,
+        nodeId,
+        startTime,
+        endTime,
+        achievableKeyVolume,
+        orbitId,
+        satelliteId=0,
+    ):
         self.id = id
         self.nodeId = nodeId
         self.startTime = startTime
         self.endTime = endTime
         self.achievableKeyVolume = achievableKeyVolume
         self.orbitId = orbitId
+        self.satelliteId = satelliteId
 
     def __repr__(self):
         return (
             f"SatellitePass(id={self.id}, nodeId={self.nodeId}, startTime={self.startTime}, "
-            f"endTime={self.endTime}, achievableKeyVolume={self.achievableKeyVolume}, orbitId={self.orbitId})"
+            f"endTime={self.endTime}, achievableKeyVolume={self.achievableKeyVolume}, orbitId={self.orbitId}, "
+            f"satelliteId={self.satelliteId})"
         )
 
     def to_dict(self):
         return self.__dict__
 
 
-# Load TLE Data for the Satellite
-ts = load.timescale()
+@lru_cache(maxsize=None)
+def get_timescale():
+    # Skyfield timescale, loaded on first use instead of at import time
+    return load.timescale()
+
 
 # UK-DMC 2
 tle_lines = [
@@ -45,120 +67,16 @@ tle_lines = [
 ]
 
 
-# Define cache file and lock file paths
-WEATHER_CACHE_FILE = "./src/input/hardData/tmp/weather_data_cache.db"
-WEATHER_LOCK_FILE = WEATHER_CACHE_FILE + ".lock"
-
-
-def shelve_weather_cache(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        key_bytes = pickle.dumps((args, kwargs))
-        key = hashlib.sha256(key_bytes).hexdigest()
-
-        with FileLock(WEATHER_LOCK_FILE):
-            with shelve.open(WEATHER_CACHE_FILE) as db:
-                if key in db:
-                    print("Weather cache hit")
-                    return db[key]
-
-        result = func(*args, **kwargs)
-
-        with FileLock(WEATHER_LOCK_FILE):
-            with shelve.open(WEATHER_CACHE_FILE) as db:
-                if key not in db:
-                    print("Weather cache write")
-                    db[key] = result
-
-        return result
-
-    return wrapper
-
-
-@shelve_weather_cache
-def fetch_weather_data_with_cloud_coverage(latitude, longitude, date, max_retries=60):
-    response = None
-
-    # Base URL for the Open-Meteo API
-    url = "https://archive-api.open-meteo.com/v1/era5"
-    params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "start_date": date,
-        "end_date": date,
-        "daily": "sunshine_duration,sunrise,sunset",
-        "timezone": "auto",
-    }
-
-    # Try making the request with retry mechanism
-    retries = 0
-    while retries < max_retries:
-        try:
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                break
-            elif response.status_code == 429:
-                print(
-                    f"Rate limit hit. Retrying in 60 seconds... ({retries+1}/{max_retries})"
-                )
-                time.sleep(60)
-                retries += 1
-            else:
-                raise Exception(
-                    f"Failed to fetch data: {response.status_code}, {response.text} "
-                    + f"with location {latitude}, {longitude}, {date}"
-                )
-        except Exception as e:
-            if retries >= max_retries - 1:
-                raise Exception(
-                    f"Exception in quarc_data_generation.py with location {latitude}, {longitude}, {date}. Exception: {e}"
-                )
-            print(
-                f"Request failed. Retrying in 60 seconds... ({retries+1}/{max_retries})"
-            )
-            time.sleep(60)
-            retries += 1
-
-    if response is None or response.status_code != 200:
-        raise Exception(
-            f"Failed to get a successful response after {max_retries} attempts."
-        )
-
-    # Parse the JSON response
-    data = response.json()
-
-    # Extract relevant data
-    sunrise = data["daily"]["sunrise"][0]
-    sunset = data["daily"]["sunset"][0]
-    sunshine_duration = data["daily"]["sunshine_duration"][0]  # In seconds
+@lru_cache(maxsize=None)
+def get_satellite(line1, line2):
+    # Satellite objects are parsed once per TLE and reused by later calls
+    return EarthSatellite(line1, line2, "QUARC", get_timescale())
 
-    # Convert sunrise and sunset to datetime objects
-    sunrise_time = datetime.fromisoformat(sunrise)
-    sunset_time = datetime.fromisoformat(sunset)
 
-    # Calculate the duration between sunrise and sunset in seconds
-    daylight_duration_seconds = (sunset_time - sunrise_time).seconds
-
-    # Calculate cloud coverage (1 - sunshine_duration / daylight_duration)
-    if daylight_duration_seconds == 0:
-        cloud_coverage = 0.5
-    else:
-        cloud_coverage = 1 - (sunshine_duration / daylight_duration_seconds)
-
-    # Convert sunshine duration to hours for easier interpretation
-    sunshine_duration_hours = sunshine_duration / 3600
-
-    return {
-        "date": date,
-        "latitude": latitude,
-        "longitude": longitude,
-        "sunrise": sunrise,
-        "sunset": sunset,
-        "sunshine_duration_hours": sunshine_duration_hours,
-        "daylight_duration_hours": daylight_duration_seconds
-        / 3600,  # Convert seconds to hours
-        "cloud_coverage_fraction": cloud_coverage,  # Value between 0 (clear) and 1 (fully cloudy)
-    }
+def get_satellites(tles):
+    # Satellites of a constellation given as a list of TLE line pairs. The satellite ID
+    # of a pass is the index of its TLE in the list
+    return [get_satellite(line1, line2) for line1, line2 in tles]
 
 
 def convert_and_sort_dataframe_to_satellite_passes(df_satellite_passes):
@@ -172,6 +90,7 @@ def convert_and_sort_dataframe_to_satellite_passes(df_satellite_passes):
             endTime=row["End"],
             achievableKeyVolume=row["Key Volume"],
             orbitId=row["Orbit"],
+            satelliteId=row["Satellite"],
         )
         satellite_passes.append(satellite_pass.to_dict())
 
@@ -180,173 +99,720 @@ def convert_and_sort_dataframe_to_satellite_passes(df_satellite_passes):
     return satellite_passes
 
 
-CACHE_FILE = "./src/input/hardData/tmp/satellite_passes_cache.db"
-LOCK_FILE = CACHE_FILE + ".lock"
+CACHE_FILE = "./src/input/hardData/tmp/satellite_passes_cache.sqlite"
 
+# The oldest pass lists are evicted beyond this number of entries, one entry per
+# satellite, terminal and time chunk
+CACHE_MAX_ENTRIES = 100000
 
-def shelve_cache(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        # Serialize args/kwargs to create a unique cache key
-        key_bytes = pickle.dumps((args, kwargs))
-        key = hashlib.sha256(key_bytes).hexdigest()
+# Pass columns stored per satellite, terminal and time chunk. The key volume is stored
+# before the cloud coverage adjustment, which depends on the start date of the stitched
+# pass
+CACHE_COLUMNS = ("Start", "End", "Key Volume")
 
-        # Use file lock for thread/process safety
-        with FileLock(LOCK_FILE):
-            with shelve.open(CACHE_FILE) as db:
-                if key in db:
-                    print("Satellite pass cache hit")
-                    return db[key]
+# Passes are computed and cached in chunks aligned to multiples of this duration since
+# the epoch, so planning horizons of different lengths share the chunks they overlap
+CHUNK_DURATION = 6 * 60 * 60
 
-        # Compute result outside lock to avoid holding it for long
-        result = func(*args, **kwargs)
+# One cache object per file and process, created on first use
+satellite_pass_caches = {}
 
-        # Store result
-        with FileLock(LOCK_FILE):
-            with shelve.open(CACHE_FILE, writeback=True) as db:
-                if key not in db:
-                    print("Satellite pass cache write")
-                    db[key] = result
 
-        return result
+def get_satellite_pass_cache(cache_file=None):
+    cache_file = cache_file or CACHE_FILE
+    if cache_file not in satellite_pass_caches:
+        satellite_pass_caches[cache_file] = SQLiteCache(
+            cache_file, max_entries=CACHE_MAX_ENTRIES
+        )
+    return satellite_pass_caches[cache_file]
+
+
+def get_satellite_pass_cache_key(
+    tle,
+    position,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    pass_detection="sampled",
+    coarse_step=60,
+    backend="skyfield",
+):
+    # Typed key of everything the passes of one satellite over one terminal depend on.
+    # The terminal ID, the satellite ID and the elevation engine are not part of it,
+    # they do not change the passes
+    return (
+        *tle,
+        float(position["lat"]),
+        float(position["lon"]),
+        float(position["alt"]),
+        # The same instant gives the same text whatever the datetime64 unit
+        np.datetime_as_string(start_time, unit="auto"),
+        np.datetime_as_string(end_time, unit="auto"),
+        float(step_duration),
+        float(min_elevation_angle),
+        pass_detection,
+        float(coarse_step),
+        backend,
+    )
 
-    return wrapper
 
+# Visible samples of a terminal that are at most this many seconds apart belong to
+# the same pass
+PASS_MERGE_GAP = 30
 
-@shelve_cache
-def get_quarc_satellite_passes(
-    ground_terminals, start_time, end_time, step_duration, min_elevation_angle
+# The ground track pre-filter of the batched engine checks the sub-satellite point
+# once per block of about this many seconds
+PREFILTER_STEP = 60
+
+# Elevation engines: "loop" evaluates one time step per Skyfield call, "vectorized"
+# evaluates the whole time grid of a terminal in a single call and "batched"
+# propagates the satellite once and evaluates all terminals together
+ELEVATION_ENGINES = ("loop", "vectorized", "batched")
+
+
+def get_elevation_angles(satellite, position, skyfield_times, engine="vectorized"):
+    ground_station = Topos(
+        latitude_degrees=position["lat"],
+        longitude_degrees=position["lon"],
+        elevation_m=position["alt"],
+    )
+    observer = satellite - ground_station
+
+    if engine == "loop":
+        elevation_angles = []
+        for t in skyfield_times:
+            alt, az, distance = observer.at(t).altaz()
+            elevation_angles.append(alt.degrees)
+        return np.array(elevation_angles)
+
+    # Skyfield propagates the full time array at once
+    alt, az, distance = observer.at(skyfield_times).altaz()
+    return alt.degrees
+
+
+def get_terminal_elevations(satellite, ground_terminals, skyfield_times, engine):
+    # Elevation angles with one row per terminal (in dict order) and one column per time step
+    if engine not in ELEVATION_ENGINES:
+        raise ValueError(f"Unknown elevation engine: {engine}")
+
+    if engine == "batched":
+        satellite_xyz = propagate_satellite_itrs(satellite, skyfield_times)
+        terminal_xyz, terminal_up = get_terminal_geometry(ground_terminals)
+        return get_elevation_matrix(satellite_xyz, terminal_xyz, terminal_up)
+
+    return np.array(
+        [
+            get_elevation_angles(satellite, position, skyfield_times, engine)
+            for position in ground_terminals.values()
+        ]
+    )
+
+
+def seconds_to_skyfield_times(start_time, offsets):
+    # Skyfield times for offsets in seconds since start_time (numpy datetime64)
+    year, month, day, hour, minute, second = get_utc_components(start_time)
+    return get_timescale().utc(
+        year, month, day, hour, minute, second + np.asarray(offsets, dtype=float)
+    )
+
+
+# Propagation backends: "skyfield" goes through Skyfield's EarthSatellite and frame
+# objects, "sgp4" calls the sgp4 array API directly and rotates TEME by GMST in NumPy
+PROPAGATION_BACKENDS = ("skyfield", "sgp4")
+
+
+def get_propagator(satellite, start_time, backend="skyfield"):
+    # Function mapping seconds since start_time to Earth-fixed positions (km), shape (3, M)
+    if backend == "skyfield":
+        return lambda offsets: propagate_satellite_itrs(
+            satellite, seconds_to_skyfield_times(start_time, offsets)
+        )
+    if backend == "sgp4":
+        dut1 = float(seconds_to_skyfield_times(start_time, 0.0).dut1)
+        return make_sgp4_propagator([satellite.model], start_time, dut1)
+    raise ValueError(f"Unknown propagation backend: {backend}")
+
+
+def get_constellation_propagator(satellites, start_time, backend="skyfield"):
+    # Function mapping seconds since start_time to Earth-fixed positions (km) of all
+    # satellites, shape (S, 3, M). The sgp4 backend propagates the whole constellation
+    # in one array call, the Skyfield backend shares the time conversion
+    if backend == "skyfield":
+
+        def propagate_skyfield(offsets):
+            skyfield_times = seconds_to_skyfield_times(start_time, offsets)
+            return np.array(
+                [
+                    propagate_satellite_itrs(satellite, skyfield_times)
+                    for satellite in satellites
+                ]
+            )
+
+        return propagate_skyfield
+    if backend == "sgp4":
+        dut1 = float(seconds_to_skyfield_times(start_time, 0.0).dut1)
+        propagate = make_sgp4_propagator(
+            [satellite.model for satellite in satellites], start_time, dut1
+        )
+        return lambda offsets: propagate(offsets).reshape(len(satellites), 3, -1)
+    raise ValueError(f"Unknown propagation backend: {backend}")
+
+
+def get_sampled_passes(
+    satellites,
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    engine="batched",
+    backend="skyfield",
+    workers=1,
+    prefilter=True,
+):
+    # Create evenly spaced time steps and one Skyfield time grid shared by all terminals
+    with timed_stage("Time grid"):
+        time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
+        time_offsets = (time_steps - start_time) / np.timedelta64(1, "s")
+        skyfield_times = seconds_to_skyfield_times(start_time, time_offsets)
+
+    with timed_stage("Elevations"):
+        # Visible samples ordered by terminal, satellite and time
+        if engine == "batched":
+            propagate = get_constellation_propagator(satellites, start_time, backend)
+            terminals, satellite_ids, steps, visible_elevations, evaluated = (
+                get_grouped_visible_samples(
+                    propagate(time_offsets),
+                    *get_terminal_geometry(ground_terminals),
+                    min_elevation_angle,
+                    workers,
+                    prefilter_stride=(
+                        max(PREFILTER_STEP // step_duration, 1) if prefilter else None
+                    ),
+                )
+            )
+            total = len(ground_terminals) * len(satellites) * len(time_offsets)
+            if prefilter and total > 0:
+                print(f"Pre-filter skipped {1 - evaluated / total:.1%} of samples")
+        elif backend == "skyfield":
+            elevation_matrix = np.stack(
+                [
+                    get_terminal_elevations(
+                        satellite, ground_terminals, skyfield_times, engine
+                    )
+                    for satellite in satellites
+                ],
+                axis=1,
+            )
+            terminals, satellite_ids, steps = np.nonzero(
+                elevation_matrix >= min_elevation_angle
+            )
+            visible_elevations = elevation_matrix[terminals, satellite_ids, steps]
+        else:
+            raise ValueError(f"Engine {engine} requires the skyfield backend")
+
+    with timed_stage("Pass grouping"):
+        # A new pass begins where the terminal or the satellite changes or consecutive
+        # visible samples are more than PASS_MERGE_GAP apart
+        new_pass = np.ones(len(steps), bool)
+        new_pass[1:] = (
+            (np.diff(terminals) != 0)
+            | (np.diff(satellite_ids) != 0)
+            | (np.diff(steps) * step_duration > PASS_MERGE_GAP)
+        )
+        pass_starts = np.flatnonzero(new_pass)
+        last_of_pass = np.ones(len(steps), bool)
+        last_of_pass[:-1] = new_pass[1:]
+        pass_ends = np.flatnonzero(last_of_pass)
+
+        start_strings = np.datetime_as_string(time_steps[steps[pass_starts]], unit="s")
+        end_strings = np.datetime_as_string(time_steps[steps[pass_ends]], unit="s")
+
+        # Pass table built directly from the index ranges; the elevations of all
+        # passes stay in one flat array with sample_counts entries per pass
+        stations = np.array(list(ground_terminals))
+        satellite_passes = pd.DataFrame(
+            {
+                "Station": stations[terminals[pass_starts]],
+                "Satellite": satellite_ids[pass_starts],
+                "Start": start_strings,
+                "End": end_strings,
+            }
+        )
+        sample_counts = pass_ends - pass_starts + 1
+    return satellite_passes, visible_elevations, sample_counts
+
+
+def get_refined_passes(
+    satellites,
+    ground_terminals,
+    start_time,
+    end_time,
+    min_elevation_angle,
+    coarse_step=60,
+    backend="skyfield",
 ):
-    # Load the satellite from TLE
-    satellite = EarthSatellite(tle_lines[0], tle_lines[1], "QUARC", ts)
-
-    # Compute orbital period in seconds
-    earth = satellite.at(ts.now())
-    elements = osculating_elements_of(earth)
-    orbit_duration = elements.period_in_days * 24 * 60 * 60
-
-    # Function that assigns a satellite pass to an orbit
-    def assign_orbit(row):
-        # Calculate the time difference between the start of the pass and the orbit start time
-        orbit_start_time = start_time
-        pass_start_time = pd.to_datetime(row["Start"])
-        time_difference = (pass_start_time - orbit_start_time).total_seconds()
-        # Calculate orbit ID
-        orbit_id = int(time_difference // orbit_duration)
-        return orbit_id
-
-    # Calculate key volume using QUARC approximation
-    def calculate_key_volume(row):
-        # Approximated key rate depending on elevation angle of satellite
-        def quarc_key_rate_approximation(elevation):
-            return (
-                -0.0145 * (elevation**3)
-                + 2.04 * (elevation**2)
-                - 20.65 * elevation
-                + 88.42
+    # Passes with refined rise and set times and their key volumes. The satellites
+    # are only propagated on the coarse grid, the root-finding and the key volume
+    # quadrature evaluate the interpolated positions
+    duration = (end_time - start_time) / np.timedelta64(1, "s")
+    terminal_xyz, terminal_up = get_terminal_geometry(ground_terminals)
+
+    windows = []
+    with timed_stage("Visibility windows"):
+        for satellite_id, satellite in enumerate(satellites):
+            propagate = get_interpolated_propagator(
+                get_propagator(satellite, start_time, backend), duration, coarse_step
             )
+            window_terminals, window_rises, window_sets = find_visibility_windows(
+                propagate,
+                terminal_xyz,
+                terminal_up,
+                duration,
+                min_elevation_angle,
+                coarse_step,
+            )
+            windows.append(
+                (
+                    window_terminals,
+                    np.full(len(window_terminals), satellite_id),
+                    window_rises,
+                    window_sets,
+                    integrate_key_volumes(
+                        propagate,
+                        terminal_xyz[:, window_terminals],
+                        terminal_up[:, window_terminals],
+                        window_rises,
+                        window_sets,
+                    ),
+                )
+            )
+    terminals, satellite_ids, rise_offsets, set_offsets, key_volumes = (
+        np.concatenate(arrays) for arrays in zip(*windows)
+    )
 
-        elevation_angles = row["Elevations"]
-        key_rates = [quarc_key_rate_approximation(e) for e in elevation_angles]
-        key_volume = sum(rate * step_duration for rate in key_rates)  # Volume in bits
-
-        # Adjust key volume depending on cloud coverage
-        terminal = row["Station"]
-        lat = ground_terminals[terminal]["lat"]
-        lon = ground_terminals[terminal]["lon"]
-        date = row["Start"]
-        # Parse the string into a datetime object
-        date_object = datetime.strptime(row["Start"], "%Y-%m-%dT%H:%M:%S")
-        # Format the datetime object to 'YYYY-MM-DD'
-        date = date_object.strftime("%Y-%m-%d")
-
-        # Fetch weather data
-        cloud_coverage_fraction = fetch_weather_data_with_cloud_coverage(
-            lat, lon, date
-        )["cloud_coverage_fraction"]
-
-        # Use cloud coverage to adjust key volume
-        return key_volume * (1 - cloud_coverage_fraction)
-
-    # Calculate Passes for Each Ground Terminal
-    print("Calculating satellite passes ...")
+    # Windows ordered by terminal, satellite and time like the sampled passes
+    order = np.lexsort((rise_offsets, satellite_ids, terminals))
+    terminals = terminals[order]
+    satellite_ids = satellite_ids[order]
+    rise_offsets = rise_offsets[order]
+    set_offsets = set_offsets[order]
+    key_volumes = key_volumes[order]
+
+    # Merge windows of a terminal and satellite that are at most PASS_MERGE_GAP
+    # seconds apart, the key volume of the dip between them is not counted
+    new_pass = np.ones(len(terminals), bool)
+    new_pass[1:] = (
+        (terminals[1:] != terminals[:-1])
+        | (satellite_ids[1:] != satellite_ids[:-1])
+        | (rise_offsets[1:] - set_offsets[:-1] > PASS_MERGE_GAP)
+    )
+    pass_starts = np.flatnonzero(new_pass)
+    if len(pass_starts) > 0:
+        set_offsets = np.maximum.reduceat(set_offsets, pass_starts)
+        key_volumes = np.add.reduceat(key_volumes, pass_starts)
+
+    # Pass times are reported with second resolution like the sampled passes
+    start_strings = np.datetime_as_string(
+        start_time + np.round(rise_offsets[pass_starts]).astype("timedelta64[s]"),
+        unit="s",
+    )
+    end_strings = np.datetime_as_string(
+        start_time + np.round(set_offsets).astype("timedelta64[s]"), unit="s"
+    )
+
+    stations = np.array(list(ground_terminals))
+    return pd.DataFrame(
+        {
+            "Station": stations[terminals[pass_starts]],
+            "Satellite": satellite_ids[pass_starts],
+            "Start": start_strings,
+            "End": end_strings,
+            "Key Volume": key_volumes,
+        }
+    )
+
+
+# Approximated key rate depending on elevation angle of satellite
+def quarc_key_rate_approximation(elevation):
+    return -0.0145 * (elevation**3) + 2.04 * (elevation**2) - 20.65 * elevation + 88.42
 
-    passes_data = []
-    for terminal, position in ground_terminals.items():
-        ground_station = Topos(
-            latitude_degrees=position["lat"],
-            longitude_degrees=position["lon"],
-            elevation_m=position["alt"],
+
+# Gauss-Legendre nodes per visibility window of the refined key volume integration
+KEY_VOLUME_QUADRATURE_ORDER = 16
+
+
+def integrate_key_volumes(
+    propagate,
+    terminal_xyz,
+    terminal_up,
+    rise_offsets,
+    set_offsets,
+    order=KEY_VOLUME_QUADRATURE_ORDER,
+):
+    # Key volume in bits of every window, the integral of the key rate over
+    # [rise, set] by Gauss-Legendre quadrature. Terminal columns match the windows
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    half_widths = (set_offsets - rise_offsets) / 2
+    offsets = (rise_offsets + half_widths)[:, np.newaxis] + half_widths[
+        :, np.newaxis
+    ] * nodes
+    elevations = get_pointwise_elevations(
+        propagate(offsets.ravel()),
+        np.repeat(terminal_xyz, order, axis=1),
+        np.repeat(terminal_up, order, axis=1),
+    ).reshape(-1, order)
+    return half_widths * (quarc_key_rate_approximation(elevations) @ weights)
+
+
+def calculate_key_volumes(elevations, sample_counts, step_duration):
+    # Key volume in bits per pass from the flat elevation samples of all passes
+    key_volumes = np.zeros(len(sample_counts))
+    has_samples = sample_counts > 0
+    segment_starts = (np.cumsum(sample_counts) - sample_counts)[has_samples]
+    if len(segment_starts) > 0:
+        key_volumes[has_samples] = (
+            np.add.reduceat(quarc_key_rate_approximation(elevations), segment_starts)
+            * step_duration
         )
-        observer = satellite - ground_station
+    return key_volumes
 
-        # Create evenly spaced time steps
-        time_steps = np.arange(start_time, end_time, np.timedelta64(step_duration, "s"))
 
-        # Convert numpy datetime64 to datetime and then to Skyfield time objects
-        skyfield_times = ts.utc(
-            [t.astype(datetime).year for t in time_steps],
-            [t.astype(datetime).month for t in time_steps],
-            [t.astype(datetime).day for t in time_steps],
-            [t.astype(datetime).hour for t in time_steps],
-            [t.astype(datetime).minute for t in time_steps],
-            [t.astype(datetime).second for t in time_steps],
+def get_cloud_coverage_fractions(
+    ground_terminals, stations, dates, weather_url=None, weather_cache_file=None
+):
+    # Cloud coverage per pass. The weather of all stations is prefetched concurrently,
+    # afterwards the dates of each station are read from the warm cache
+    station_dates = {
+        terminal: sorted(set(dates[stations == terminal].tolist()))
+        for terminal in dict.fromkeys(stations.tolist())
+    }
+    location_dates = {}
+    for terminal, terminal_dates in station_dates.items():
+        position = ground_terminals[terminal]
+        location_dates.setdefault((position["lat"], position["lon"]), set()).update(
+            terminal_dates
         )
-        elevation_angles = []
-        for time in skyfield_times:
-            alt, az, distance = observer.at(time).altaz()
-            elevation_angles.append((time.utc_iso().replace("Z", ""), alt.degrees))
+    prefetch_weather(location_dates, weather_url, weather_cache_file)
+
+    cloud_coverage = {}
+    for terminal, terminal_dates in station_dates.items():
+        fractions = get_cloud_coverage(
+            ground_terminals[terminal]["lat"],
+            ground_terminals[terminal]["lon"],
+            terminal_dates,
+            weather_url,
+            weather_cache_file,
+        )
+        for date, fraction in fractions.items():
+            cloud_coverage[terminal, date] = fraction
+    return np.array(
+        [cloud_coverage[pair] for pair in zip(stations.tolist(), dates.tolist())]
+    )
+
 
-        # Filter for Above Horizon Passes
-        elevation_angles = [
-            (t, e) for t, e in elevation_angles if e >= min_elevation_angle
+def calculate_satellite_passes(
+    satellites,
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    engine="batched",
+    pass_detection="sampled",
+    coarse_step=60,
+    backend="skyfield",
+    workers=1,
+    prefilter=True,
+):
+    # Calculate passes of each satellite over each ground terminal, the Satellite column
+    # holds the index into satellites
+    print("Calculating satellite passes ...")
+    if pass_detection == "sampled":
+        df_satellite_passes, elevations, sample_counts = get_sampled_passes(
+            satellites,
+            ground_terminals,
+            start_time,
+            end_time,
+            step_duration,
+            min_elevation_angle,
+            engine,
+            backend,
+            workers,
+            prefilter,
+        )
+    elif pass_detection == "refined":
+        # The key volume is integrated over the refined windows, the step_duration
+        # grid is not evaluated
+        return get_refined_passes(
+            satellites,
+            ground_terminals,
+            start_time,
+            end_time,
+            min_elevation_angle,
+            coarse_step,
+            backend,
+        )
+    else:
+        raise ValueError(f"Unknown pass detection: {pass_detection}")
+
+    # Calculate approximated key volume, the cloud coverage is applied after stitching
+    print("Calculating key volumes ...")
+    with timed_stage("Key volumes"):
+        df_satellite_passes["Key Volume"] = calculate_key_volumes(
+            elevations, sample_counts, step_duration
+        )
+    return df_satellite_passes
+
+
+def get_time_chunks(start_time, end_time, step_duration, chunk_duration=None):
+    # Chunks of the window with borders on its sampling grid start_time + k *
+    # step_duration, so they reproduce the samples of the whole window also for starts
+    # with fractional seconds or off the step. Each border is the first grid point at
+    # or after a multiple of chunk_duration (default CHUNK_DURATION) since the epoch, so
+    # windows on the same grid share their chunks and a chunk spans less than
+    # chunk_duration + step_duration
+    chunk_duration = int(chunk_duration or CHUNK_DURATION)
+    nanoseconds = 10**9
+    start = int(start_time.astype("datetime64[ns]").astype(np.int64))
+    end = int(end_time.astype("datetime64[ns]").astype(np.int64))
+    step = int(step_duration) * nanoseconds
+
+    border_steps = []
+    multiple = (start // (chunk_duration * nanoseconds) + 1) * chunk_duration
+    while True:
+        steps = -((start - multiple * nanoseconds) // step)
+        if start + steps * step >= end:
+            break
+        if not border_steps or steps > border_steps[-1]:
+            border_steps.append(steps)
+        multiple += chunk_duration
+
+    borders = [
+        start_time + np.timedelta64(steps * int(step_duration), "s")
+        for steps in border_steps
+    ]
+    return list(zip([start_time] + borders, borders + [end_time]))
+
+
+def stitch_chunk_passes(df_chunk_passes):
+    # Joins the parts of passes that cross a chunk border with the same rule as the
+    # pass grouping. Rows are ordered by terminal and satellite, then by chunk and time
+    starts = df_chunk_passes["Start"].to_numpy(dtype="datetime64[s]")
+    ends = df_chunk_passes["End"].to_numpy(dtype="datetime64[s]")
+    stations = df_chunk_passes["Station"].to_numpy()
+    satellites = df_chunk_passes["Satellite"].to_numpy()
+    chunks = df_chunk_passes["Chunk"].to_numpy()
+
+    new_pass = np.ones(len(starts), bool)
+    new_pass[1:] = (
+        (stations[1:] != stations[:-1])
+        | (satellites[1:] != satellites[:-1])
+        | (chunks[1:] == chunks[:-1])
+        | ((starts[1:] - ends[:-1]) / np.timedelta64(1, "s") > PASS_MERGE_GAP)
+    )
+    pass_starts = np.flatnonzero(new_pass)
+    if len(pass_starts) == len(starts):
+        return df_chunk_passes.drop("Chunk", axis=1)
+
+    last_of_pass = np.ones(len(starts), bool)
+    last_of_pass[:-1] = new_pass[1:]
+    return pd.DataFrame(
+        {
+            "Station": stations[pass_starts],
+            "Satellite": satellites[pass_starts],
+            "Start": df_chunk_passes["Start"].to_numpy()[pass_starts],
+            "End": df_chunk_passes["End"].to_numpy()[last_of_pass],
+            "Key Volume": np.add.reduceat(
+                df_chunk_passes["Key Volume"].to_numpy(), pass_starts
+            ),
+        }
+    )
+
+
+def get_quarc_satellite_passes(
+    ground_terminals,
+    start_time,
+    end_time,
+    step_duration,
+    min_elevation_angle,
+    engine="batched",
+    pass_detection="sampled",
+    coarse_step=60,
+    backend="skyfield",
+    workers=1,
+    tles=None,
+    prefilter=True,
+    cache_file=None,
+    chunk_duration=None,
+    weather_url=None,
+    weather_cache_file=None,
+):
+    # workers > 1 spreads the elevation matrices of terminal groups over processes
+    # (batched engine with sampled pass detection), the result does not depend on it.
+    # tles is a list of TLE line pairs of a constellation, by default the QUARC stand-in.
+    # prefilter skips samples far from the ground track before the elevation matrix.
+    # cache_file, chunk_duration, weather_url and weather_cache_file default to the
+    # module constants of this module and of weather
+
+    # Load the satellites from TLE
+    tles = tles or [tle_lines]
+    satellites = get_satellites(tles)
+
+    # Compute orbital period in seconds of each satellite
+    now = get_timescale().now()
+    orbit_durations = np.array(
+        [
+            osculating_elements_of(satellite.at(now)).period_in_days * 24 * 60 * 60
+            for satellite in satellites
         ]
+    )
 
-        # Group into Passes
-        current_pass = []
-        for t, e in elevation_angles:
-            if (
-                not current_pass
-                or (
-                    datetime.fromisoformat(t)
-                    - datetime.fromisoformat(current_pass[-1][0])
-                ).seconds
-                <= 30
-            ):
-                current_pass.append((t, e))
-            else:
-                if current_pass:
-                    passes_data.append({"station": terminal, "pass": current_pass})
-                current_pass = [(t, e)]
-        if current_pass:
-            passes_data.append({"station": terminal, "pass": current_pass})
-
-    # Convert to DataFrame
-    satellite_passes = []
-    for pass_info in passes_data:
-        station = pass_info["station"]
-        times, elevations = zip(*pass_info["pass"])
-        satellite_passes.append(
+    # Passes are cached per satellite, terminal and time chunk, only missing entries
+    # are computed. Each chunk is computed for all satellites at once, which bounds the
+    # memory by the chunk duration
+    cache = get_satellite_pass_cache(cache_file)
+    chunks = get_time_chunks(start_time, end_time, step_duration, chunk_duration)
+    keys = {
+        (terminal, satellite_id, chunk): get_satellite_pass_cache_key(
+            tle,
+            position,
+            chunk_start,
+            chunk_end,
+            step_duration,
+            min_elevation_angle,
+            pass_detection,
+            coarse_step,
+            backend,
+        )
+        for terminal, position in ground_terminals.items()
+        for satellite_id, tle in enumerate(tles)
+        for chunk, (chunk_start, chunk_end) in enumerate(chunks)
+    }
+    chunk_passes = cache.get_many(keys.values())
+    print(
+        "Satellite pass cache hit for "
+        f"{sum(key in chunk_passes for key in keys.values())} of {len(keys)} "
+        f"satellite terminal chunks"
+    )
+
+    # The worker processes of workers > 1 are shared by the chunks of this call
+    try:
+        for chunk, (chunk_start, chunk_end) in enumerate(chunks):
+            missing = [
+                (terminal, satellite_id)
+                for terminal in ground_terminals
+                for satellite_id in range(len(satellites))
+                if keys[terminal, satellite_id, chunk] not in chunk_passes
+            ]
+            if not missing:
+                continue
+            missing_terminals = {
+                terminal: ground_terminals[terminal] for terminal, _ in missing
+            }
+            missing_satellites = sorted({satellite_id for _, satellite_id in missing})
+            df_new_passes = calculate_satellite_passes(
+                [satellites[satellite_id] for satellite_id in missing_satellites],
+                missing_terminals,
+                chunk_start,
+                chunk_end,
+                step_duration,
+                min_elevation_angle,
+                engine,
+                pass_detection,
+                coarse_step,
+                backend,
+                workers,
+                prefilter,
+            )
+
+            # Rows are ordered by terminal and satellite, so each pair owns one contiguous
+            # slice
+            pair_indices = (
+                pd.Index(list(missing_terminals)).get_indexer(df_new_passes["Station"])
+                * len(missing_satellites)
+                + df_new_passes["Satellite"].to_numpy()
+            )
+            bounds = np.searchsorted(
+                pair_indices,
+                np.arange(len(missing_terminals) * len(missing_satellites) + 1),
+            )
+            new_entries = {}
+            for i, terminal in enumerate(missing_terminals):
+                for j, satellite_id in enumerate(missing_satellites):
+                    pair = i * len(missing_satellites) + j
+                    new_entries[keys[terminal, satellite_id, chunk]] = {
+                        column: df_new_passes[column].to_numpy()[
+                            bounds[pair] : bounds[pair + 1]
+                        ]
+                        for column in CACHE_COLUMNS
+                    }
+            cache.set_many(new_entries)
+            chunk_passes.update(new_entries)
+    finally:
+        shutdown_process_pools()
+
+    # Merge terminals in dict order, their satellites in list order and the chunks in
+    # time order, which keeps the pass IDs of a full computation
+    entries = [
+        chunk_passes[keys[terminal, satellite_id, chunk]]
+        for terminal in ground_terminals
+        for satellite_id in range(len(satellites))
+        for chunk in range(len(chunks))
+    ]
+    entry_lengths = [len(entry["Start"]) for entry in entries]
+    df_satellite_passes = stitch_chunk_passes(
+        pd.DataFrame(
             {
-                "Station": station,
-                "Start": times[0],
-                "End": times[-1],
-                "Elevations": elevations,
+                "Station": np.repeat(
+                    np.repeat(list(ground_terminals), len(satellites) * len(chunks)),
+                    entry_lengths,
+                ),
+                "Satellite": np.repeat(
+                    np.tile(
+                        np.repeat(np.arange(len(satellites)), len(chunks)),
+                        len(ground_terminals),
+                    ),
+                    entry_lengths,
+                ),
+                "Chunk": np.repeat(
+                    np.tile(
+                        np.arange(len(chunks)), len(ground_terminals) * len(satellites)
+                    ),
+                    entry_lengths,
+                ),
+                **{
+                    column: np.concatenate([entry[column] for entry in entries])
+                    for column in CACHE_COLUMNS
+                },
             }
         )
-    df_satellite_passes = pd.DataFrame(satellite_passes)
-
-    # Calculate approximated key volume
-    print("Calculating key volumes ...")
-    df_satellite_passes["Key Volume"] = df_satellite_passes.apply(
-        calculate_key_volume, axis=1
     )
-    df_satellite_passes = df_satellite_passes.drop("Elevations", axis=1)
 
-    # Calculate orbits
+    # Adjust the key volume by the cloud coverage on the pass date
+    with timed_stage("Cloud coverage"):
+        df_satellite_passes["Key Volume"] = df_satellite_passes["Key Volume"] * (
+            1
+            - get_cloud_coverage_fractions(
+                ground_terminals,
+                df_satellite_passes["Station"].to_numpy(),
+                df_satellite_passes["Start"].str[:10].to_numpy(),
+                weather_url,
+                weather_cache_file,
+            )
+        )
+
+    # Calculate orbits from the pass start in seconds since start_time
     print("Calculating orbits ...")
-    df_satellite_passes["Orbit"] = df_satellite_passes.apply(assign_orbit, axis=1)
-    # print(df_satellite_passes)
+    with timed_stage("Orbits"):
+        start_offsets = (
+            df_satellite_passes["Start"].to_numpy(dtype="datetime64[s]") - start_time
+        ) / np.timedelta64(1, "s")
+        df_satellite_passes["Orbit"] = (
+            start_offsets
+            // orbit_durations[df_satellite_passes["Satellite"].to_numpy()]
+        ).astype(int)
 
     # Convert satellite passes dataframe to list of satellite pass objects
     satellite_passes_dict_list = convert_and_sort_dataframe_to_satellite_passes(
@@ -0,0 +1,316 @@
+"""
+Cloud coverage from the Open-Meteo ERA5 archive, fetched per location and date range
+"""
+
+import os
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date as Date, datetime, timedelta
+from .cache import SQLiteCache
+
+# Base URL for the Open-Meteo archive API, can point to a local stand-in server
+WEATHER_URL = os.environ.get(
+    "WEATHER_URL", "https://archive-api.open-meteo.com/v1/era5"
+)
+
+# Daily weather records keyed by (latitude, longitude, date)
+WEATHER_CACHE_FILE = "./src/input/hardData/tmp/weather_cache.sqlite"
+
+# ERA5 data becomes available with a delay of about five days
+ERA5_DELAY_DAYS = 5
+
+# Request budget for concurrent prefetching, the public API allows 600 per minute
+WEATHER_REQUESTS_PER_MINUTE = int(os.environ.get("WEATHER_REQUESTS_PER_MINUTE", 500))
+WEATHER_WORKERS = 8
+
+
+class TokenBucket:
+    # Rate limiter shared by threads: bursts of up to capacity requests, refilled at
+    # requests_per_minute
+    def __init__(self, requests_per_minute, capacity=10):
+        self.rate = requests_per_minute / 60
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Reserve a token, callers queue up by driving the balance below zero
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+# HTTP sessions by process ID. Each process creates its own on first use, forked
+# workers must not share the pooled connections of their parent
+http_sessions = {}
+
+
+def get_http_session():
+    # The connection pool keeps the connections to the archive API alive across
+    # requests and prefetch threads
+    if os.getpid() not in http_sessions:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=WEATHER_WORKERS
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        http_sessions[os.getpid()] = session
+    return http_sessions[os.getpid()]
+
+
+# One cache object per file and process, created on first use
+weather_caches = {}
+
+
+def get_weather_cache(cache_file=None):
+    # cache_file defaults to WEATHER_CACHE_FILE, tests and benchmarks pass their own
+    cache_file = cache_file or WEATHER_CACHE_FILE
+    if cache_file not in weather_caches:
+        weather_caches[cache_file] = SQLiteCache(cache_file)
+    return weather_caches[cache_file]
+
+
+def get_weather_cache_key(latitude, longitude, date):
+    return float(latitude), float(longitude), date
+
+
+def get_fetch_range(dates):
+    # Missing dates are extended to their whole calendar year, so later runs with
+    # other planning horizons are answered from the cache
+    first = Date.fromisoformat(min(dates))
+    last = Date.fromisoformat(max(dates))
+    latest_available = Date.today() - timedelta(days=ERA5_DELAY_DAYS)
+    end = max(last, min(Date(last.year, 12, 31), latest_available))
+    return Date(first.year, 1, 1).isoformat(), end.isoformat()
+
+
+def get_backoff(retries, response=None, initial_backoff=1, max_backoff=60):
+    # Exponential backoff, a Retry-After header of a 429 response takes precedence
+    if response is not None and "Retry-After" in response.headers:
+        try:
+            return min(float(response.headers["Retry-After"]), max_backoff)
+        except ValueError:
+            pass
+    return min(initial_backoff * 2**retries, max_backoff)
+
+
+def request_weather_range(
+    latitude,
+    longitude,
+    start_date,
+    end_date,
+    url=None,
+    max_retries=60,
+    rate_limiter=None,
+):
+    response = None
+    url = url or WEATHER_URL
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": "sunshine_duration,sunrise,sunset",
+        "timezone": "auto",
+    }
+
+    # Try making the request with retry mechanism
+    retries = 0
+    while retries < max_retries:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = get_http_session().get(url, params=params)
+            if response.status_code == 200:
+                break
+            elif response.status_code == 429:
+                backoff = get_backoff(retries, response)
+                print(
+                    f"Rate limit hit. Retrying in {backoff:.0f} seconds... ({retries+1}/{max_retries})"
+                )
+                time.sleep(backoff)
+                retries += 1
+            else:
+                raise Exception(
+                    f"Failed to fetch data: {response.status_code}, {response.text} "
+                    + f"with location {latitude}, {longitude}, {start_date} - {end_date}"
+                )
+        except Exception as e:
+            if retries >= max_retries - 1:
+                raise Exception(
+                    f"Exception in weather.py with location {latitude}, {longitude}, "
+                    + f"{start_date} - {end_date}. Exception: {e}"
+                )
+            backoff = get_backoff(retries)
+            print(
+                f"Request failed. Retrying in {backoff:.0f} seconds... ({retries+1}/{max_retries})"
+            )
+            time.sleep(backoff)
+            retries += 1
+
+    if response is None or response.status_code != 200:
+        raise Exception(
+            f"Failed to get a successful response after {max_retries} attempts."
+        )
+    return response.json()
+
+
+def get_daily_weather_records(latitude, longitude, data):
+    # Weather record with cloud coverage for each day of an archive response
+    records = {}
+    daily = data["daily"]
+    for date, sunrise, sunset, sunshine_duration in zip(
+        daily["time"], daily["sunrise"], daily["sunset"], daily["sunshine_duration"]
+    ):
+        # Days without data are not stored, so they are requested again later
+        if sunrise is None or sunset is None or sunshine_duration is None:
+            continue
+
+        # Calculate the duration between sunrise and sunset in seconds
+        daylight_duration_seconds = (
+            datetime.fromisoformat(sunset) - datetime.fromisoformat(sunrise)
+        ).seconds
+
+        # Calculate cloud coverage (1 - sunshine_duration / daylight_duration)
+        if daylight_duration_seconds == 0:
+            cloud_coverage = 0.5
+        else:
+            cloud_coverage = 1 - (sunshine_duration / daylight_duration_seconds)
+
+        records[date] = {
+            "date": date,
+            "latitude": latitude,
+            "longitude": longitude,
+            "sunrise": sunrise,
+            "sunset": sunset,
+            "sunshine_duration_hours": sunshine_duration / 3600,
+            "daylight_duration_hours": daylight_duration_seconds / 3600,
+            "cloud_coverage_fraction": cloud_coverage,  # Value between 0 (clear) and 1 (fully cloudy)
+        }
+    return records
+
+
+def read_weather_cache(location_dates, cache_file=None):
+    # Cached daily records per (latitude, longitude) with a single bulk lookup
+    keys = [
+        get_weather_cache_key(*location, date)
+        for location, dates in location_dates.items()
+        for date in dates
+    ]
+    cached = get_weather_cache(cache_file).get_many(keys)
+    records = {location: {} for location in location_dates}
+    for (latitude, longitude, date), record in cached.items():
+        records[latitude, longitude][date] = record
+    return records
+
+
+def write_weather_cache(location_records, cache_file=None):
+    # Stores the daily records of each (latitude, longitude)
+    get_weather_cache(cache_file).set_many(
+        {
+            get_weather_cache_key(*location, date): record
+            for location, records in location_records.items()
+            for date, record in records.items()
+        }
+    )
+
+
+def fetch_weather_records(
+    latitude, longitude, missing_dates, url=None, rate_limiter=None
+):
+    start_date, end_date = get_fetch_range(missing_dates)
+    print(f"Weather fetch {latitude}, {longitude}: {start_date} - {end_date}")
+    data = request_weather_range(
+        latitude, longitude, start_date, end_date, url, rate_limiter=rate_limiter
+    )
+    return get_daily_weather_records(latitude, longitude, data)
+
+
+def select_weather_records(latitude, longitude, location_records, dates):
+    for date in dates:
+        if date not in location_records:
+            raise Exception(
+                f"No weather data for location {latitude}, {longitude}, {date}"
+            )
+    return {date: location_records[date] for date in dates}
+
+
+def get_weather_records(latitude, longitude, dates, url=None, cache_file=None):
+    # Weather records for the given dates (YYYY-MM-DD) of one location. Dates missing
+    # in the cache are fetched together with a single range request.
+    location = (float(latitude), float(longitude))
+    records = read_weather_cache({location: dates}, cache_file)[location]
+
+    missing = [date for date in dates if date not in records]
+    if missing:
+        fetched = fetch_weather_records(latitude, longitude, missing, url)
+        write_weather_cache({location: fetched}, cache_file)
+        records.update(fetched)
+    return select_weather_records(latitude, longitude, records, dates)
+
+
+def prefetch_weather(
+    location_dates,
+    url=None,
+    cache_file=None,
+    requests_per_minute=None,
+    max_workers=WEATHER_WORKERS,
+):
+    """
+    Warms the cache for a dict mapping (latitude, longitude) to the dates needed
+    there. Locations with missing dates are fetched concurrently, one range request
+    each, within the requests_per_minute budget. Returns the number of fetched
+    locations.
+    """
+    location_dates = {
+        (float(latitude), float(longitude)): dates
+        for (latitude, longitude), dates in location_dates.items()
+    }
+    cached = read_weather_cache(location_dates, cache_file)
+    missing = {}
+    for location, dates in location_dates.items():
+        location_missing = [date for date in dates if date not in cached[location]]
+        if location_missing:
+            missing[location] = location_missing
+    if not missing:
+        return 0
+
+    rate_limiter = TokenBucket(requests_per_minute or WEATHER_REQUESTS_PER_MINUTE)
+    fetched = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    fetch_weather_records, *location, dates, url, rate_limiter
+                ): location
+                for location, dates in missing.items()
+            }
+            for future in as_completed(futures):
+                fetched[futures[future]] = future.result()
+    finally:
+        # Records are written in one transaction, also when a location failed so that
+        # the others are not fetched again
+        if fetched:
+            write_weather_cache(fetched, cache_file)
+    return len(missing)
+
+
+def get_cloud_coverage(latitude, longitude, dates, url=None, cache_file=None):
+    # Cloud coverage fraction per date of one location
+    records = get_weather_records(latitude, longitude, dates, url, cache_file)
+    return {date: record["cloud_coverage_fraction"] for date, record in records.items()}
+
+
+def fetch_weather_data_with_cloud_coverage(latitude, longitude, date):
+    return get_weather_records(latitude, longitude, [date])[date]
@@ -0,0 +1,359 @@
+"""
+Columnar binary format for problem instances (.npz)
+
+Passes and service targets are stored as one typed array per field, times as int64
+seconds since the epoch (UTC) and the scalar fields as UTF-8 encoded JSON. The arrays
+are written uncompressed, so they can be memory-mapped straight from the archive.
+"""
+
+import argparse
+import array
+import glob
+import json
+import os
+import re
+import zipfile
+import numpy as np
+from datetime import datetime
+
+# Array name in the archive, key in the JSON instance and dtype of every column
+PASS_COLUMNS = {
+    "pass_id": ("id", "<i4"),
+    "pass_node_id": ("nodeId", "<i4"),
+    "pass_start_time": ("startTime", "<i8"),
+    "pass_end_time": ("endTime", "<i8"),
+    "pass_achievable_key_volume": ("achievableKeyVolume", "<f8"),
+    "pass_orbit_id": ("orbitId", "<i4"),
+    "pass_satellite_id": ("satelliteId", "<i4"),
+}
+TARGET_COLUMNS = {
+    "target_id": ("id", "<i4"),
+    "target_application_id": ("applicationId", "<i4"),
+    "target_priority": ("priority", "<f8"),
+    "target_node_id": ("nodeId", "<i4"),
+    "target_requested_operation": ("requestedOperation", "|i1"),
+}
+TIME_COLUMNS = ("pass_start_time", "pass_end_time")
+
+# Requested operations are stored as their index in this tuple
+REQUESTED_OPERATIONS = ("QKD", "OPTICAL_ONLY")
+
+# Instance fields holding the record lists, the streaming reader yields their records
+# one by one
+RECORD_FIELDS = {"satellite_passes": PASS_COLUMNS, "service_targets": TARGET_COLUMNS}
+
+# array module type codes of the column dtypes
+ARRAY_TYPECODES = {"<i4": "i", "<i8": "q", "<f8": "d", "|i1": "b"}
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def to_epoch_seconds(times):
+    return np.array(times, dtype="datetime64[s]").astype(np.int64)
+
+
+def from_epoch_seconds(seconds):
+    return np.datetime_as_string(np.asarray(seconds).astype("datetime64[s]"), unit="s")
+
+
+def save_problem_instance_npz(problem_instance, file_name):
+    problem_instance = dict(problem_instance)
+    for table, columns in RECORD_FIELDS.items():
+        records = problem_instance[table]
+        problem_instance[table] = {}
+        for name, (key, dtype) in columns.items():
+            # Instances generated before passes were tagged belong to satellite 0
+            values = [record.get(key, 0) for record in records]
+            if name in TIME_COLUMNS:
+                values = to_epoch_seconds(values)
+            elif key == "requestedOperation":
+                values = [REQUESTED_OPERATIONS.index(value) for value in values]
+            problem_instance[table][key] = np.array(values, dtype=dtype).reshape(-1)
+    problem_instance["requested_operations"] = list(REQUESTED_OPERATIONS)
+    save_problem_instance_arrays_npz(problem_instance, file_name)
+
+
+def save_problem_instance_arrays_npz(problem_instance, file_name):
+    # Writes the columnar structure returned by read_problem_instance_arrays
+    arrays = {}
+    for table, columns in RECORD_FIELDS.items():
+        for name, (key, dtype) in columns.items():
+            arrays[name] = np.asarray(problem_instance[table][key], dtype=dtype)
+
+    metadata = {
+        key: value
+        for key, value in problem_instance.items()
+        if key not in RECORD_FIELDS
+    }
+    arrays["metadata"] = np.frombuffer(
+        json.dumps(metadata, default=str).encode(), dtype="|u1"
+    )
+    np.savez(file_name, **arrays)
+
+
+def load_npz_memmap(file_name):
+    """
+    Memory-maps every array of an uncompressed .npz archive (np.load ignores
+    mmap_mode for archives). Each member is a .npy file stored as is, so its data
+    starts after the local zip header and the .npy header.
+    """
+    arrays = {}
+    with zipfile.ZipFile(file_name) as archive, open(file_name, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{file_name}: {info.filename} is compressed")
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length = int.from_bytes(local_header[26:28], "little")
+            extra_length = int.from_bytes(local_header[28:30], "little")
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[: -len(".npy")]
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype)
+            else:
+                arrays[name] = np.memmap(
+                    file_name,
+                    dtype=dtype,
+                    mode="r",
+                    offset=f.tell(),
+                    shape=shape,
+                    order="F" if fortran_order else "C",
+                )
+    return arrays
+
+
+def read_problem_instance_arrays(file_name):
+    """
+    Reads a .npz instance without copying the columns: returns the scalar fields and
+    the dicts "satellite_passes" and "service_targets" of memory-mapped arrays, keyed
+    like the JSON records. Times stay int64 epoch seconds and requested operations
+    indices into "requested_operations".
+    """
+    arrays = load_npz_memmap(file_name)
+    problem_instance = json.loads(bytes(arrays["metadata"]).decode())
+    problem_instance["satellite_passes"] = {
+        key: arrays[name] for name, (key, _) in PASS_COLUMNS.items()
+    }
+    problem_instance["service_targets"] = {
+        key: arrays[name] for name, (key, _) in TARGET_COLUMNS.items()
+    }
+    return problem_instance
+
+
+def read_problem_instance_npz(file_name):
+    # Same structure as the JSON instances, for the solvers that iterate over records
+    problem_instance = read_problem_instance_arrays(file_name)
+    for table, columns in (
+        ("satellite_passes", PASS_COLUMNS),
+        ("service_targets", TARGET_COLUMNS),
+    ):
+        values = {}
+        for name, (key, _) in columns.items():
+            column = problem_instance[table][key]
+            if name in TIME_COLUMNS:
+                values[key] = from_epoch_seconds(column).tolist()
+            elif key == "requestedOperation":
+                operations = problem_instance["requested_operations"]
+                values[key] = [operations[code] for code in column.tolist()]
+            else:
+                values[key] = column.tolist()
+        problem_instance[table] = [
+            dict(zip(values, record)) for record in zip(*values.values())
+        ]
+    del problem_instance["requested_operations"]
+    return problem_instance
+
+
+class JSONStream:
+    # Reads JSON text in chunks; values are decoded one at a time with the standard
+    # decoder, so only the value being parsed has to be in memory
+
+    def __init__(self, file, chunk_size=1 << 20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.exhausted = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        # Drops the parsed text and reads at least as much as is buffered, so a value
+        # that spans many chunks is re-decoded only a logarithmic number of times
+        if self.exhausted:
+            return False
+        self.buffer = self.buffer[self.position :]
+        self.position = 0
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer)))
+        self.exhausted = not chunk
+        self.buffer += chunk
+        return bool(chunk)
+
+    def peek(self):
+        # Next character that is not whitespace, "" at the end of the file
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self.fill():
+                return self.buffer[self.position : self.position + 1]
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} but found {character!r} in JSON stream"
+            )
+        self.position += 1
+        return character
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.exhausted:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self.fill()
+
+
+def iter_problem_instance(file_name, chunk_size=1 << 20):
+    """
+    Parses the first problem instance of a JSON file incrementally and yields
+    (field, value) pairs in file order. The records of the satellite_passes and
+    service_targets lists are yielded one by one as (field, record), all other fields
+    once with their whole value.
+    """
+    with open(file_name, "r") as f:
+        stream = JSONStream(f, chunk_size)
+        stream.expect("[")
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            field = stream.decode()
+            stream.expect(":")
+            if field in RECORD_FIELDS and stream.peek() == "[":
+                stream.expect("[")
+                if stream.peek() != "]":
+                    while True:
+                        yield field, stream.decode()
+                        if stream.expect(",]") == "]":
+                            break
+                else:
+                    stream.expect("]")
+            else:
+                yield field, stream.decode()
+            if stream.expect(",}") == "}":
+                return
+
+
+def read_problem_instance_records(file_name, pass_indices, target_indices):
+    # Dicts from list position to record of the passes and targets at the given
+    # positions, the other records are dropped as soon as they are parsed
+    satellite_passes, service_targets = {}, {}
+    positions = {"satellite_passes": 0, "service_targets": 0}
+    for field, value in iter_problem_instance(file_name):
+        if field not in positions:
+            continue
+        if field == "satellite_passes" and positions[field] in pass_indices:
+            satellite_passes[positions[field]] = value
+        elif field == "service_targets" and positions[field] in target_indices:
+            service_targets[positions[field]] = value
+        positions[field] += 1
+    return satellite_passes, service_targets
+
+
+def read_problem_instance_streaming(file_name):
+    """
+    Reads a JSON instance into the columnar structure of read_problem_instance_arrays
+    without building the dict tree: every record is parsed on its own and appended
+    to typed arrays, the columns are numpy views of them.
+    """
+    problem_instance = {}
+    columns = {
+        field: {
+            key: array.array(ARRAY_TYPECODES[dtype]) for key, dtype in fields.values()
+        }
+        for field, fields in RECORD_FIELDS.items()
+    }
+    time_keys = {PASS_COLUMNS[name][0] for name in TIME_COLUMNS}
+    epoch = datetime(1970, 1, 1)
+    for field, value in iter_problem_instance(file_name):
+        if field not in RECORD_FIELDS:
+            problem_instance[field] = value
+            continue
+        for key, values in columns[field].items():
+            # Instances generated before passes were tagged belong to satellite 0
+            item = value.get(key, 0)
+            if key in time_keys:
+                item = int((datetime.fromisoformat(item) - epoch).total_seconds())
+            elif key == "requestedOperation":
+                item = REQUESTED_OPERATIONS.index(item)
+            values.append(item)
+
+    for field, fields in RECORD_FIELDS.items():
+        problem_instance[field] = {
+            key: np.frombuffer(columns[field][key], dtype=dtype)
+            for key, dtype in fields.values()
+        }
+    problem_instance["requested_operations"] = list(REQUESTED_OPERATIONS)
+    return problem_instance
+
+
+def convert_json_to_npz(json_file, npz_file=None):
+    # The JSON files hold a list with a single problem instance, it is streamed into
+    # the columns without building the dict tree
+    npz_file = npz_file or json_file[: -len(".json")] + ".npz"
+    save_problem_instance_arrays_npz(
+        read_problem_instance_streaming(json_file), npz_file
+    )
+    return npz_file
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts JSON problem instances to the columnar .npz format"
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="JSON files or directories searched recursively"
+    )
+    parser.add_argument("-overwrite", action="store_true")
+    args = parser.parse_args()
+
+    json_files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            # Index maps of presolved instances (see src/presolve.py) are no instances
+            json_files += sorted(
+                json_file
+                for json_file in glob.glob(
+                    os.path.join(path, "**", "*.json"), recursive=True
+                )
+                if not json_file.endswith("_map.json")
+            )
+        else:
+            json_files.append(path)
+
+    for json_file in json_files:
+        npz_file = json_file[: -len(".json")] + ".npz"
+        if os.path.exists(npz_file) and not args.overwrite:
+            print(f"Skipped: {npz_file} exists")
+            continue
+        convert_json_to_npz(json_file, npz_file)
+        print(
+            f"Converted: {json_file} ({os.path.getsize(json_file) / 2**20:.1f} MiB) -> "
+            f"{npz_file} ({os.path.getsize(npz_file) / 2**20:.1f} MiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Dominance presolve of problem instances
+
+Targets at the same node with the same requested operation can be served by the same
+passes and only differ in priority, so a served target can always be swapped for an
+unserved one of higher priority. At most as many targets of an operation can be
+served at a node as the node has passes that are eligible for it and pairwise free
+of conflicts, so only that many of the highest priority targets are kept. Passes of
+different satellites never conflict, so the counts of the satellites add up. QKD
+targets at nodes without a pass with key volume are dropped.
+
+The reduction keeps the optimum of the model with pass, target and non-overlap rows.
+The QKD before post-processing rows couple the targets of an application: a served
+QKD target needs its post-processing targets to be served later. With sequencing=True
+all targets of applications with a servable QKD target and a post-processing target
+are kept, and only the remaining targets are reduced. Instances presolved without
+it must not be solved with the sequencing rows.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from .utils import read_problem_instance
+
+T_MIN = 60  # Minimum time between consecutive contacts in seconds
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(time):
+    return (datetime.fromisoformat(time) - EPOCH).total_seconds()
+
+
+def get_max_compatible_passes(intervals, T_min=T_MIN):
+    # Largest number of passes without conflicts among (start, end) pairs: earliest
+    # end first is optimal for intervals
+    count = 0
+    available_from = None
+    for start, end in sorted(intervals, key=lambda interval: interval[1]):
+        if available_from is None or start >= available_from:
+            count += 1
+            available_from = end + T_min
+    return count
+
+
+def presolve_problem_instance(problem_instance, T_min=T_MIN, sequencing=False):
+    """
+    Returns the reduced instance and the list positions of its service targets in
+    the original instance. Passes and the kept target records are unchanged, so
+    contacts of the reduced instance refer to the original IDs. sequencing keeps the
+    optimum of the model with the QKD before post-processing rows.
+    """
+    passes = problem_instance["satellite_passes"]
+    targets = problem_instance["service_targets"]
+
+    # Pass intervals per node, requested operation and satellite
+    intervals = {}
+    for sp in passes:
+        interval = (to_seconds(sp["startTime"]), to_seconds(sp["endTime"]))
+        satellite_id = sp.get("satelliteId", 0)
+        operations = ["OPTICAL_ONLY"]
+        if sp["achievableKeyVolume"] != 0.0:
+            operations.append("QKD")
+        for operation in operations:
+            intervals.setdefault((sp["nodeId"], operation), {}).setdefault(
+                satellite_id, []
+            ).append(interval)
+
+    # Applications whose targets appear in sequencing rows that can bind
+    coupled = set()
+    if sequencing:
+        qkd_applications, post_processing_applications = set(), set()
+        for st in targets:
+            if st["requestedOperation"] != "QKD":
+                post_processing_applications.add(st["applicationId"])
+            elif (st["nodeId"], "QKD") in intervals:
+                qkd_applications.add(st["applicationId"])
+        coupled = qkd_applications & post_processing_applications
+
+    # Target positions per node and requested operation, highest priority first
+    candidates = {}
+    kept = []
+    for position, st in enumerate(targets):
+        if st["applicationId"] in coupled:
+            kept.append(position)
+            continue
+        candidates.setdefault((st["nodeId"], st["requestedOperation"]), []).append(
+            position
+        )
+    for key, positions in candidates.items():
+        limit = sum(
+            get_max_compatible_passes(satellite_intervals, T_min)
+            for satellite_intervals in intervals.get(key, {}).values()
+        )
+        positions.sort(key=lambda position: -targets[position]["priority"])
+        kept += positions[:limit]
+    kept.sort()
+
+    reduced_instance = dict(problem_instance)
+    reduced_instance["service_targets"] = [targets[position] for position in kept]
+    reduced_instance["number_service_targets"] = len(kept)
+    reduced_instance["presolved"] = True
+    reduced_instance["presolved_for_sequencing"] = sequencing
+    return reduced_instance, kept
+
+
+def write_presolved_instance(json_file, T_min=T_MIN, sequencing=False):
+    # Writes <name>_presolved.json and the index map <name>_presolved_map.json
+    problem_instance = read_problem_instance(json_file)
+    reduced_instance, kept = presolve_problem_instance(
+        problem_instance, T_min, sequencing
+    )
+
+    presolved_file = json_file[: -len(".json")] + "_presolved.json"
+    with open(presolved_file, "w") as f:
+        json.dump([reduced_instance], f, indent=4, default=str)
+    index_map = {
+        "original_instance": os.path.basename(json_file),
+        "service_target_positions": kept,
+        "service_target_ids": [
+            problem_instance["service_targets"][position]["id"] for position in kept
+        ],
+    }
+    with open(presolved_file[: -len(".json")] + "_map.json", "w") as f:
+        json.dump(index_map, f)
+    return presolved_file, len(problem_instance["service_targets"]), len(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keeps only the service targets that can be part of an optimum"
+    )
+    parser.add_argument("json_files", nargs="+")
+    parser.add_argument(
+        "-sequencing",
+        action="store_true",
+        help="keep the optimum with the QKD before post-processing rows, as in "
+        "src/solvers/gurobi_solver.py and scip_solver.py",
+    )
+    args = parser.parse_args()
+
+    for json_file in args.json_files:
+        presolved_file, number_targets, number_kept = write_presolved_instance(
+            json_file, sequencing=args.sequencing
+        )
+        print(
+            f"Presolved: {json_file} -> {presolved_file}, kept {number_kept} of "
+            f"{number_targets} service targets"
+        )
+
+
+if __name__ == "__main__":
+    main()
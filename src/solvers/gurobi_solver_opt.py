@@ -1,3 +1,4 @@
+import argparse
 import os
 import time
 from datetime import datetime
@@ -6,6 +7,16 @@ from ..utils import *
 
 max_solve_time = 600
 
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-conflict_formulation",
+    choices=["bigm", "clique"],
+    default="bigm",
+    help="non-overlap constraints: one big-M row per conflicting pair (bigm) or "
+    "one row per maximal clique of conflicting passes (clique)",
+)
+conflict_formulation = parser.parse_args().conflict_formulation
+
 start = time.time()
 
 # MPS file path
@@ -33,7 +44,7 @@ else:
     print("Building model from scratch...")
 
     print("Start setting up problem and model")
-    di, ti, bi, ni, fi, oi = {}, {}, {}, {}, {}, {}
+    di, ti, bi, ni, fi, oi, si = {}, {}, {}, {}, {}, {}, {}
     reference_time = datetime.fromisoformat(problemInstance["coverage_start"])
 
     for idx, sp in enumerate(satellitePasses):
@@ -45,6 +56,8 @@ else:
         oi[idx] = 1 if sp["achievableKeyVolume"] == 0.0 else 0
         ni[idx] = sp["nodeId"]
         fi[idx] = sp["orbitId"]
+        # Instances written before multi-satellite support have one satellite
+        si[idx] = sp.get("satelliteId", 0)
 
     pj, sj, mj, aj = {}, {}, {}, {}
     for idx, st in enumerate(serviceTargets):
@@ -56,41 +69,53 @@ else:
     model = Model("Satellite Optimization")
 
     # Decision variables: only create if node and mode match
-    x = {}
-    for i in V:
-        for j in S:
-            if ni[i] == sj[j] and not (oi[i] == 1 and mj[j] == 1):
-                x[i, j] = model.addVar(vtype=GRB.BINARY, name=f"x_{i}_{j}")
-
-    model.update()
+    with timed_stage("Variable creation"):
+        x = {}
+        for i, j in get_assignment_pairs(ni, oi, sj, mj):
+            x[i, j] = model.addVar(vtype=GRB.BINARY, name=f"x_{i}_{j}")
+        model.update()
+    print(f"Decision variables: {len(x)} of {len(V) * len(S)} pairs")
 
     # Objective
     model.setObjective(
         quicksum(x[i, j] * pj[j] * (1 + bi[i] * mj[j]) for (i, j) in x), GRB.MAXIMIZE
     )
 
+    # Assignment expression of every pass, built once and shared by the pass rows and
+    # the non-overlap rows
+    pass_targets, target_passes = group_assignment_pairs(x)
+    assigned = {i: quicksum(x[i, j] for j in pass_targets.get(i, ())) for i in V}
+
     # Constraints: each pass at most once
     for i in V:
-        model.addConstr(quicksum(x[i, j] for j in S if (i, j) in x) <= 1)
+        model.addConstr(assigned[i] <= 1)
 
     # Constraints: each target at most once
     for j in S:
-        model.addConstr(quicksum(x[i, j] for i in V if (i, j) in x) <= 1)
-
-    # Non-overlapping satellite passes (optimized)
-    sorted_V = sorted(V, key=lambda i: ti[i])
-    for idx1, i1 in enumerate(sorted_V):
-        for idx2 in range(idx1 + 1, len(sorted_V)):
-            i2 = sorted_V[idx2]
-            if ti[i2] - (ti[i1] + di[i1]) >= T_min:
-                break
-            expr1 = quicksum(x[i1, k] for k in S if (i1, k) in x)
-            expr2 = quicksum(x[i2, k] for k in S if (i2, k) in x)
-            # Use big-M constraint
-            M = 99999
-            model.addConstr(
-                (ti[i1] + di[i1] + T_min) <= (ti[i2] + (2 - expr1 - expr2) * M)
-            )
+        model.addConstr(quicksum(x[i, j] for i in target_passes.get(j, ())) <= 1)
+
+    # Non-overlapping satellite passes: one row per maximal clique of conflicting
+    # passes, or one big-M row per conflicting pair
+    if conflict_formulation == "clique":
+        for clique in get_conflict_cliques(ti, di, T_min, si):
+            model.addConstr(quicksum(assigned[i] for i in clique) <= 1)
+    else:
+        sorted_V = sorted(V, key=lambda i: ti[i])
+        for idx1, i1 in enumerate(sorted_V):
+            for idx2 in range(idx1 + 1, len(sorted_V)):
+                i2 = sorted_V[idx2]
+                if ti[i2] - (ti[i1] + di[i1]) >= T_min:
+                    break
+                # Only passes of the same satellite compete for its terminal
+                if si[i2] != si[i1]:
+                    continue
+                expr1 = assigned[i1]
+                expr2 = assigned[i2]
+                # Use big-M constraint
+                M = 99999
+                model.addConstr(
+                    (ti[i1] + di[i1] + T_min) <= (ti[i2] + (2 - expr1 - expr2) * M)
+                )
 
     # Application sequencing constraints: QKD before Post-Processing
     """for app_id in set(aj.values()):
@@ -98,8 +123,8 @@ else:
         pp_targets = [j for j in S if aj[j] == app_id and mj[j] == 0]
         for j1 in qkd_targets:
             for j2 in pp_targets:
-                lhs = quicksum(ti[i] * x[i, j1] for i in V if (i, j1) in x)
-                rhs = quicksum(ti[i] * x[i, j2] for i in V if (i, j2) in x)
+                lhs = quicksum(ti[i] * x[i, j1] for i in target_passes.get(j1, ()))
+                rhs = quicksum(ti[i] * x[i, j2] for i in target_passes.get(j2, ()))
                 model.addConstr(lhs <= rhs)"""
 
     # Save the model to MPS file
@@ -117,17 +142,17 @@ try:
     model.setParam("Seed", int("1999999999"))
     model.optimize()
 
+    # The variables are named x_i_j, also when the model is read from the MPS file
     contacts = []
-    for i in V:
-        for j in S:
-            var = model.getVarByName(f"x_{i}_{j}")
-            if var is not None and var.X > 0.5:
-                contacts.append(
-                    {
-                        "satellitePass": satellitePasses[i],
-                        "serviceTarget": serviceTargets[j],
-                    }
-                )
+    for var in model.getVars():
+        if var.VarName.startswith("x_") and var.X > 0.5:
+            _, i, j = var.VarName.split("_")
+            contacts.append(
+                {
+                    "satellitePass": satellitePasses[int(i)],
+                    "serviceTarget": serviceTargets[int(j)],
+                }
+            )
 
     solution_valid = verify_contacts_solution(contacts, T_min)
     if not solution_valid:
@@ -1,3 +1,4 @@
+import argparse
 from datetime import datetime
 from pyscipopt import Model, quicksum
 from ..utils import *
@@ -5,17 +6,28 @@ import time
 
 start = time.time()
 
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-conflict_formulation",
+    choices=["bigm", "clique"],
+    default="bigm",
+    help="non-overlap constraints: one big-M row per conflicting pair (bigm) or "
+    "one row per maximal clique of conflicting passes (clique)",
+)
+conflict_formulation = parser.parse_args().conflict_formulation
+
 # Read problem instance
 print("Read problem instance")
 problemInstance = read_problem_instance("./src/input/data/train_world_dec_10_12h.json")
 satellitePasses = problemInstance["satellite_passes"]
 serviceTargets = problemInstance["service_targets"]
+check_presolved_for_sequencing(problemInstance)
 
 print("Start setting up problem and model")
 V = list(range(len(satellitePasses)))
 S = list(range(len(serviceTargets)))
 
-di, ti, bi, ni, fi, oi = {}, {}, {}, {}, {}, {}
+di, ti, bi, ni, fi, oi, si = {}, {}, {}, {}, {}, {}, {}
 reference_time = datetime.fromisoformat(problemInstance["coverage_start"])
 
 for idx, sp in enumerate(satellitePasses):
@@ -27,6 +39,8 @@ for idx, sp in enumerate(satellitePasses):
     oi[idx] = 1 if sp["achievableKeyVolume"] == 0.0 else 0
     ni[idx] = sp["nodeId"]
     fi[idx] = sp["orbitId"]
+    # Instances written before multi-satellite support have one satellite
+    si[idx] = sp.get("satelliteId", 0)
 
 pj, sj, mj, aj = {}, {}, {}, {}
 for idx, st in enumerate(serviceTargets):
@@ -40,37 +54,50 @@ T_min = 60  # Minimum time between consecutive contacts in seconds
 model = Model("Satellite Optimization")
 
 # Decision variables: only create if node and mode match
-x = {}
-for i in V:
-    for j in S:
-        if ni[i] == sj[j] and not (oi[i] == 1 and mj[j] == 1):
-            x[i, j] = model.addVar(vtype="B", name=f"x_{i}_{j}")
+with timed_stage("Variable creation"):
+    x = {}
+    for i, j in get_assignment_pairs(ni, oi, sj, mj):
+        x[i, j] = model.addVar(vtype="B", name=f"x_{i}_{j}")
+print(f"Decision variables: {len(x)} of {len(V) * len(S)} pairs")
 
 # Objective
 model.setObjective(
     quicksum(x[i, j] * pj[j] * (1 + bi[i] * mj[j]) for (i, j) in x), "maximize"
 )
 
+# Assignment expression of every pass, built once and shared by the pass rows and
+# the non-overlap rows
+pass_targets, target_passes = group_assignment_pairs(x)
+assigned = {i: quicksum(x[i, j] for j in pass_targets.get(i, ())) for i in V}
+
 # Constraints: each pass at most once
 for i in V:
-    model.addCons(quicksum(x[i, j] for j in S if (i, j) in x) <= 1)
+    model.addCons(assigned[i] <= 1)
 
 # Constraints: each target at most once
 for j in S:
-    model.addCons(quicksum(x[i, j] for i in V if (i, j) in x) <= 1)
-
-# Non-overlapping satellite passes (optimized)
-sorted_V = sorted(V, key=lambda i: ti[i])
-for idx1, i1 in enumerate(sorted_V):
-    for idx2 in range(idx1 + 1, len(sorted_V)):
-        i2 = sorted_V[idx2]
-        if ti[i2] - (ti[i1] + di[i1]) >= T_min:
-            break
-        expr1 = quicksum(x[i1, k] for k in S if (i1, k) in x)
-        expr2 = quicksum(x[i2, k] for k in S if (i2, k) in x)
-        model.addCons(
-            (ti[i1] + di[i1] + T_min) <= (ti[i2] + (2 - expr1 - expr2) * 99999)
-        )
+    model.addCons(quicksum(x[i, j] for i in target_passes.get(j, ())) <= 1)
+
+# Non-overlapping satellite passes: one row per maximal clique of conflicting
+# passes, or one big-M row per conflicting pair
+if conflict_formulation == "clique":
+    for clique in get_conflict_cliques(ti, di, T_min, si):
+        model.addCons(quicksum(assigned[i] for i in clique) <= 1)
+else:
+    sorted_V = sorted(V, key=lambda i: ti[i])
+    for idx1, i1 in enumerate(sorted_V):
+        for idx2 in range(idx1 + 1, len(sorted_V)):
+            i2 = sorted_V[idx2]
+            if ti[i2] - (ti[i1] + di[i1]) >= T_min:
+                break
+            # Only passes of the same satellite compete for its terminal
+            if si[i2] != si[i1]:
+                continue
+            expr1 = assigned[i1]
+            expr2 = assigned[i2]
+            model.addCons(
+                (ti[i1] + di[i1] + T_min) <= (ti[i2] + (2 - expr1 - expr2) * 99999)
+            )
 
 # Application sequencing constraints: QKD before Post-Processing
 for app_id in set(aj.values()):
@@ -79,8 +106,8 @@ for app_id in set(aj.values()):
     for j1 in qkd_targets:
         for j2 in pp_targets:
             model.addCons(
-                quicksum(ti[i] * x[i, j1] for i in V if (i, j1) in x)
-                <= quicksum(ti[i] * x[i, j2] for i in V if (i, j2) in x)
+                quicksum(ti[i] * x[i, j1] for i in target_passes.get(j1, ()))
+                <= quicksum(ti[i] * x[i, j2] for i in target_passes.get(j2, ()))
             )
 
 # Optimize
@@ -88,15 +115,14 @@ try:
     model.optimize()
 
     contacts = []
-    for i in V:
-        for j in S:
-            if (i, j) in x and model.getVal(x[i, j]) > 0.5:
-                contacts.append(
-                    {
-                        "satellitePass": satellitePasses[i],
-                        "serviceTarget": serviceTargets[j],
-                    }
-                )
+    for i, j in x:
+        if model.getVal(x[i, j]) > 0.5:
+            contacts.append(
+                {
+                    "satellitePass": satellitePasses[i],
+                    "serviceTarget": serviceTargets[j],
+                }
+            )
 
     print("###### Result ######")
     print(
@@ -0,0 +1,96 @@
+package com.optimization.solver;
+
+import java.io.IOException;
+import java.io.InputStream;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.charset.StandardCharsets;
+import java.util.HashMap;
+import java.util.Map;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+import java.util.zip.ZipEntry;
+import java.util.zip.ZipFile;
+
+// Reads the 1-D arrays of a .npz archive written by src/instance_format.py
+public class NpzReader {
+
+    private static final Pattern DESCR = Pattern.compile("'descr':\\s*'([^']+)'");
+    private static final Pattern SHAPE = Pattern.compile("'shape':\\s*\\((\\d*),?\\)");
+
+    // Array data (little endian) and element type (numpy descr, e.g. "<i4") by array name
+    private final Map<String, ByteBuffer> buffers = new HashMap<>();
+    private final Map<String, String> types = new HashMap<>();
+
+    public NpzReader(String path) throws IOException {
+        try (ZipFile zipFile = new ZipFile(path)) {
+            var entries = zipFile.entries();
+            while (entries.hasMoreElements()) {
+                ZipEntry entry = entries.nextElement();
+                byte[] bytes;
+                try (InputStream in = zipFile.getInputStream(entry)) {
+                    bytes = in.readAllBytes();
+                }
+                String name = entry.getName().replaceAll("\\.npy$", "");
+                readNpy(name, ByteBuffer.wrap(bytes).order(ByteOrder.LITTLE_ENDIAN));
+            }
+        }
+    }
+
+    // .npy layout: magic "\x93NUMPY", version, header length, header dict, data
+    private void readNpy(String name, ByteBuffer buffer) throws IOException {
+        buffer.position(6);
+        int majorVersion = buffer.get();
+        buffer.get();
+        int headerLength = majorVersion == 1 ? Short.toUnsignedInt(buffer.getShort()) : buffer.getInt();
+        byte[] headerBytes = new byte[headerLength];
+        buffer.get(headerBytes);
+        String header = new String(headerBytes, StandardCharsets.ISO_8859_1);
+
+        Matcher descr = DESCR.matcher(header);
+        Matcher shape = SHAPE.matcher(header);
+        if (!descr.find() || !shape.find() || header.contains("'fortran_order': True")) {
+            throw new IOException("Unsupported array " + name + ": " + header);
+        }
+        types.put(name, descr.group(1));
+        buffers.put(name, buffer.slice().order(ByteOrder.LITTLE_ENDIAN));
+    }
+
+    private ByteBuffer getBuffer(String name, String type) throws IOException {
+        if (!buffers.containsKey(name)) {
+            throw new IOException("Missing array " + name);
+        }
+        if (!types.get(name).equals(type)) {
+            throw new IOException("Array " + name + " has type " + types.get(name) + ", expected " + type);
+        }
+        return buffers.get(name).duplicate().order(ByteOrder.LITTLE_ENDIAN);
+    }
+
+    public int[] getInts(String name) throws IOException {
+        ByteBuffer buffer = getBuffer(name, "<i4");
+        int[] values = new int[buffer.remaining() / 4];
+        buffer.asIntBuffer().get(values);
+        return values;
+    }
+
+    public long[] getLongs(String name) throws IOException {
+        ByteBuffer buffer = getBuffer(name, "<i8");
+        long[] values = new long[buffer.remaining() / 8];
+        buffer.asLongBuffer().get(values);
+        return values;
+    }
+
+    public double[] getDoubles(String name) throws IOException {
+        ByteBuffer buffer = getBuffer(name, "<f8");
+        double[] values = new double[buffer.remaining() / 8];
+        buffer.asDoubleBuffer().get(values);
+        return values;
+    }
+
+    public byte[] getBytes(String name) throws IOException {
+        ByteBuffer buffer = getBuffer(name, "|i1".equals(types.get(name)) ? "|i1" : "|u1");
+        byte[] values = new byte[buffer.remaining()];
+        buffer.get(values);
+        return values;
+    }
+}
@@ -4,6 +4,8 @@ import java.io.File;
 import java.io.IOException;
 import java.security.Provider.Service;
 import java.time.Duration;
+import java.time.LocalDateTime;
+import java.time.ZoneOffset;
 import java.util.Arrays;
 import java.util.HashMap;
 import java.util.LinkedList;
@@ -38,7 +40,9 @@ public class Utils {
 
     @SuppressWarnings("CallToPrintStackTrace")
     public static Solution readProblemInstance(String path) throws Exception {
-        Solution solution = new Solution();
+        if (path.endsWith(".npz")) {
+            return readProblemInstanceNpz(path);
+        }
 
         File jsonFile = new File(path);
 
@@ -77,6 +81,62 @@ public class Utils {
             }
         }
 
+        return createSolution(satellitePasses, serviceTargets);
+    }
+
+    // Reads the columnar .npz layout of src/instance_format.py
+    public static Solution readProblemInstanceNpz(String path) throws Exception {
+        NpzReader reader = new NpzReader(path);
+
+        LinkedList<SatellitePass> satellitePasses = new LinkedList<>();
+        int[] passIds = reader.getInts("pass_id");
+        int[] passNodeIds = reader.getInts("pass_node_id");
+        long[] startTimes = reader.getLongs("pass_start_time");
+        long[] endTimes = reader.getLongs("pass_end_time");
+        double[] keyVolumes = reader.getDoubles("pass_achievable_key_volume");
+        int[] orbitIds = reader.getInts("pass_orbit_id");
+        int[] satelliteIds = reader.getInts("pass_satellite_id");
+        for (int i = 0; i < passIds.length; i++) {
+            SatellitePass satellitePass = new SatellitePass();
+            satellitePass.setId(passIds[i]);
+            satellitePass.setNodeId(passNodeIds[i]);
+            // Times are stored as seconds since the epoch in UTC
+            satellitePass.setStartTime(LocalDateTime.ofEpochSecond(startTimes[i], 0, ZoneOffset.UTC));
+            satellitePass.setEndTime(LocalDateTime.ofEpochSecond(endTimes[i], 0, ZoneOffset.UTC));
+            satellitePass.setAchievableKeyVolume(keyVolumes[i]);
+            satellitePass.setOrbitId(orbitIds[i]);
+            satellitePass.setSatelliteId(satelliteIds[i]);
+            satellitePasses.add(satellitePass);
+        }
+
+        // Requested operations are indices into the list stored with the metadata
+        JsonNode metadata = new ObjectMapper().readTree(reader.getBytes("metadata"));
+        JsonNode operations = metadata.get("requested_operations");
+
+        LinkedList<ServiceTarget> serviceTargets = new LinkedList<>();
+        int[] targetIds = reader.getInts("target_id");
+        int[] applicationIds = reader.getInts("target_application_id");
+        double[] priorities = reader.getDoubles("target_priority");
+        int[] targetNodeIds = reader.getInts("target_node_id");
+        byte[] requestedOperations = reader.getBytes("target_requested_operation");
+        for (int i = 0; i < targetIds.length; i++) {
+            ServiceTarget serviceTarget = new ServiceTarget();
+            serviceTarget.setId(targetIds[i]);
+            serviceTarget.setApplicationId(applicationIds[i]);
+            serviceTarget.setPriority(priorities[i]);
+            serviceTarget.setNodeId(targetNodeIds[i]);
+            serviceTarget.setRequestedOperation(operations.get(requestedOperations[i]).asText());
+            serviceTargets.add(serviceTarget);
+        }
+
+        return createSolution(satellitePasses, serviceTargets);
+    }
+
+    // Links every service target to the passes that can serve it
+    public static Solution createSolution(LinkedList<SatellitePass> satellitePasses,
+            LinkedList<ServiceTarget> serviceTargets) {
+        Solution solution = new Solution();
+
         for (ServiceTarget st : serviceTargets) {
             LinkedList<SatellitePass> possibleSatellitePasses = new LinkedList<>();
             for (SatellitePass sp : satellitePasses) {
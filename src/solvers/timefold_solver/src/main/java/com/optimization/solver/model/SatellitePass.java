@@ -16,4 +16,5 @@ public class SatellitePass {
     private LocalDateTime endTime;
     private double achievableKeyVolume;
     private int orbitId;
+    private int satelliteId;
 }
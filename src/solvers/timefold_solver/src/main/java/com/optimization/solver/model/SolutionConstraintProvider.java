@@ -56,6 +56,10 @@ public class SolutionConstraintProvider implements ConstraintProvider {
                     if (p1 == null || p2 == null)
                         return false;
 
+                    // Only passes of the same satellite compete for its terminal
+                    if (p1.getSatelliteId() != p2.getSatelliteId())
+                        return false;
+
                     return isOverlapping(p1, p2, t_min);
                 })
                 .penalize("Overlapping contacts", HardSoftBigDecimalScore.ONE_HARD);
@@ -1,17 +1,114 @@
 import json
 import json
+import time
+from contextlib import contextmanager
 from datetime import datetime
-import matplotlib.pyplot as plt
 
 SOLUTION_VISUALIZATION_PATH = "./src/output/visualization/"
 
+# Accumulated runtime in seconds per named stage (see timed_stage)
+stage_timings = {}
+
+
+# Measures the runtime of a stage, prints it and adds it to stage_timings
+@contextmanager
+def timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stage_timings[name] = stage_timings.get(name, 0.0) + duration
+        print(f"{name} took {duration:.3f}s")
+
 
 def read_problem_instance(instance_path):
+    # Columnar .npz instances are read with instance_format
+    if instance_path.endswith(".npz"):
+        from .instance_format import read_problem_instance_npz
+
+        return read_problem_instance_npz(instance_path)
     with open(instance_path, "r") as file:
         data = json.load(file)
         return data[0]
 
 
+# Instances reduced by the dominance presolve (see presolve.py) only keep the optimum
+# of models with the QKD before post-processing rows if they were presolved with
+# sequencing=True
+def check_presolved_for_sequencing(problem_instance):
+    if problem_instance.get("presolved") and not problem_instance.get(
+        "presolved_for_sequencing"
+    ):
+        raise Exception(
+            "The instance was presolved without the application sequencing rows, "
+            "solve the original instance or presolve it with -sequencing"
+        )
+
+
+# (pass, target) index pairs that get a decision variable: the pass is at the node of
+# the target and has key volume if QKD is requested. Targets are grouped by node, so
+# only the targets at the node of a pass are visited. Pairs are ordered by pass, then
+# target, like the double loop over all passes and targets
+def get_assignment_pairs(ni, oi, sj, mj):
+    node_targets = {}
+    for j, node in sj.items():
+        node_targets.setdefault(node, []).append(j)
+    return [
+        (i, j)
+        for i, node in ni.items()
+        for j in node_targets.get(node, ())
+        if not (oi[i] == 1 and mj[j] == 1)
+    ]
+
+
+# Targets per pass and passes per target of the assignment pairs, in pair order
+def group_assignment_pairs(pairs):
+    pass_targets, target_passes = {}, {}
+    for i, j in pairs:
+        pass_targets.setdefault(i, []).append(j)
+        target_passes.setdefault(j, []).append(i)
+    return pass_targets, target_passes
+
+
+# Maximal cliques of the pass conflict graph, for the clique formulation of the
+# non-overlap constraints. Two passes of the same satellite conflict if the later one
+# starts less than T_min after the end of the earlier one, i.e. their intervals
+# [ti, ti + di + T_min) overlap. The graph of each satellite is an interval graph, a
+# sweep over the interval ends finds its maximal cliques: the active passes form one
+# whenever an end follows a start. Cliques of a single pass are left out, each pass is
+# assigned at most once anyway. si maps passes to satellites, by default all passes
+# belong to one satellite
+def get_conflict_cliques(ti, di, T_min=60, si=None):
+    satellite_passes = {}
+    for i in ti:
+        satellite_passes.setdefault(0 if si is None else si[i], []).append(i)
+
+    cliques = []
+    for passes in satellite_passes.values():
+        events = []
+        for i in passes:
+            # Empty intervals conflict with nothing
+            if di[i] + T_min > 0:
+                events.append((ti[i], 1, i))
+                events.append((ti[i] + di[i] + T_min, 0, i))
+        # Ends sort before starts at the same time, the intervals are half-open
+        events.sort()
+
+        active = set()
+        grown = False
+        for _, is_start, i in events:
+            if is_start:
+                active.add(i)
+                grown = True
+                continue
+            if grown and len(active) > 1:
+                cliques.append(sorted(active))
+            grown = False
+            active.remove(i)
+    return cliques
+
+
 def plotOptimizationResult(
     serviceTargets,
     satellitePasses,
@@ -19,6 +116,9 @@ def plotOptimizationResult(
     optimizer,
     output_path=SOLUTION_VISUALIZATION_PATH,
 ):
+    # Imported on first use, pyplot dominates the import time of the solver scripts
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(14, 6))
 
     # Check which nodes have service demand
@@ -126,6 +226,7 @@ def read_contacts_from_timefold(file_path):
                     ),
                     "achievableKeyVolume": satellite_pass.get("achievableKeyVolume"),
                     "orbitId": satellite_pass.get("orbitId"),
+                    "satelliteId": satellite_pass.get("satelliteId"),
                 },
             }
         )
@@ -173,7 +274,9 @@ def verify_contacts_solution(contacts, T_min=60):
 
         start_time = datetime.fromisoformat(sp["startTime"])
         end_time = datetime.fromisoformat(sp["endTime"])
-        pass_times[pass_id] = (start_time, end_time)
+        # Instances written before multi-satellite support have one satellite
+        satellite_id = sp.get("satelliteId") or 0
+        pass_times.setdefault(satellite_id, {})[pass_id] = (start_time, end_time)
 
         # Group contact times by application for sequencing
         app_id = st["applicationId"]
@@ -184,14 +287,15 @@ def verify_contacts_solution(contacts, T_min=60):
         else:
             application_times[app_id]["PP"].append(start_time)
 
-    # Constraint: No overlapping satellite passes with less than T_min separation
-    sorted_times = sorted(pass_times.items(), key=lambda x: x[1][0])
-    for i in range(len(sorted_times) - 1):
-        _, (start1, end1) = sorted_times[i]
-        _, (start2, _) = sorted_times[i + 1]
-        if (start2 - end1).total_seconds() < T_min:
-            print(f"Passes overlap or are too close: {end1} vs {start2}")
-            return False
+    # Constraint: No overlapping passes of a satellite with less than T_min separation
+    for satellite_times in pass_times.values():
+        sorted_times = sorted(satellite_times.items(), key=lambda x: x[1][0])
+        for i in range(len(sorted_times) - 1):
+            _, (start1, end1) = sorted_times[i]
+            _, (start2, _) = sorted_times[i + 1]
+            if (start2 - end1).total_seconds() < T_min:
+                print(f"Passes overlap or are too close: {end1} vs {start2}")
+                return False
 
     # Constraint: QKD must come before Post-Processing for each application
     for app_id, times in application_times.items():
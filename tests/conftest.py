@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import date as Date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+
+class StandInWeatherHandler(BaseHTTPRequestHandler):
+    # Local stand-in for the Open-Meteo archive API with deterministic daily sunshine
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        latitude = float(query["latitude"][0])
+        longitude = float(query["longitude"][0])
+        start = Date.fromisoformat(query["start_date"][0])
+        end = Date.fromisoformat(query["end_date"][0])
+        days = [
+            (start + timedelta(days=i)).isoformat()
+            for i in range((end - start).days + 1)
+        ]
+
+        # Simulated rate limit over a sliding window of one second
+        with self.server.lock:
+            now = time.monotonic()
+            recent = self.server.recent_requests
+            while recent and now - recent[0] > 1:
+                recent.popleft()
+            rate_limited = (
+                self.server.requests_per_second is not None
+                and len(recent) >= self.server.requests_per_second
+            )
+            self.server.request_count += 1
+            if rate_limited:
+                self.server.rate_limited_count += 1
+            else:
+                recent.append(now)
+        if rate_limited:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(self.server.latency)
+
+        body = json.dumps(
+            {
+                "daily": {
+                    "time": days,
+                    "sunrise": [f"{day}T06:00" for day in days],
+                    "sunset": [f"{day}T18:00" for day in days],
+                    "sunshine_duration": [
+                        zlib.crc32(f"{latitude},{longitude},{day}".encode()) % 43200
+                        for day in days
+                    ],
+                }
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def weather_server():
+    # Starts local stand-ins for the Open-Meteo archive API, returns (server, url)
+    servers = []
+
+    def start(latency=0, requests_per_second=None):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInWeatherHandler)
+        server.latency = latency
+        server.requests_per_second = requests_per_second
+        server.recent_requests = deque()
+        server.lock = threading.Lock()
+        server.request_count = 0
+        server.rate_limited_count = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_port}/v1/era5"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,115 @@
+"""
+Problem instances and the HiGHS reference solve shared by the tests
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import milp, Bounds, LinearConstraint
+from src.input.create_problems import get_service_targets
+
+
+def get_pass(id, node_id, satellite_id, start, end):
+    return {
+        "id": id,
+        "nodeId": node_id,
+        "startTime": f"2024-04-15T{start}",
+        "endTime": f"2024-04-15T{end}",
+        "achievableKeyVolume": 1.0,
+        "orbitId": 0,
+        "satelliteId": satellite_id,
+    }
+
+
+def get_target(id, node_id):
+    return {
+        "id": id,
+        "applicationId": id,
+        "priority": 1.0,
+        "nodeId": node_id,
+        "requestedOperation": "QKD",
+    }
+
+
+# Pass 1 overlaps passes 0 and 2 but belongs to another satellite, passes 0 and 2 of
+# satellite 0 conflict
+PROBLEM_INSTANCE = {
+    "coverage_start": "2024-04-15T00:00:00",
+    "coverage_end": "2024-04-15T01:00:00",
+    "satellite_passes": [
+        get_pass(0, 0, 0, "00:10:00", "00:15:00"),
+        get_pass(1, 1, 1, "00:12:00", "00:17:00"),
+        get_pass(2, 1, 0, "00:15:30", "00:20:00"),
+    ],
+    "service_targets": [get_target(0, 0), get_target(1, 1), get_target(2, 1)],
+}
+
+
+# Problem instance with one random pass per terminal and orbit of 5700s, every tenth
+# pass without key volume
+def get_random_problem_instance(
+    number_ground_terminals, start_time, end_time, number_application_contexts
+):
+    rng = np.random.default_rng(0)
+    orbit_duration = np.timedelta64(5700, "s")
+    satellite_passes = []
+    for node_id in range(number_ground_terminals):
+        for orbit_id, orbit_start in enumerate(
+            np.arange(start_time, end_time, orbit_duration)
+        ):
+            pass_start = orbit_start + np.timedelta64(int(rng.integers(0, 5000)), "s")
+            key_volume = float(rng.uniform(0, 1e6))
+            satellite_passes.append(
+                {
+                    "id": len(satellite_passes),
+                    "nodeId": node_id,
+                    "startTime": str(pass_start),
+                    "endTime": str(
+                        pass_start + np.timedelta64(int(rng.integers(60, 600)), "s")
+                    ),
+                    "achievableKeyVolume": key_volume if rng.random() > 0.1 else 0.0,
+                    "orbitId": orbit_id,
+                    "satelliteId": 0,
+                }
+            )
+    return {
+        "problem_instance_id": "test",
+        "coverage_start": start_time,
+        "coverage_end": end_time,
+        "min_elevation_angle": 15,
+        "number_satellite_passes": len(satellite_passes),
+        "satellite_passes": satellite_passes,
+        "service_targets": get_service_targets(
+            number_ground_terminals, number_application_contexts
+        ),
+    }
+
+
+def get_inequality_rows(matrices):
+    # All rows of the model of get_model_matrices in "<=" form
+    conflict_sign = 1.0 if matrices["conflict_sense"] == "<" else -1.0
+    rows = sparse.vstack(
+        [
+            matrices["pass_rows"],
+            matrices["target_rows"],
+            conflict_sign * matrices["conflict_rows"],
+        ]
+    ).tocsr()
+    rhs = np.concatenate(
+        [
+            np.ones(matrices["pass_rows"].shape[0] + matrices["target_rows"].shape[0]),
+            conflict_sign * matrices["conflict_rhs"],
+        ]
+    )
+    return rows, rhs
+
+
+def get_highs_optimum(objective, rows, rhs):
+    # Maximum of objective @ x over binary x with rows @ x <= rhs
+    result = milp(
+        -objective,
+        constraints=LinearConstraint(rows, -np.inf, rhs),
+        integrality=np.ones(len(objective)),
+        bounds=Bounds(0, 1),
+    )
+    assert result.success
+    return -result.fun
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from src.input.cache import SQLiteCache
+
+
+def test_typed_keys_round_trip(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.set_many({(1.5, 2.0, "2024-04-15"): {"value": 1}, ("a", 15): [1, 2]})
+    assert cache.get((1.5, 2.0, "2024-04-15")) == {"value": 1}
+    assert cache.get_many([("a", 15), ("b", 15)]) == {("a", 15): [1, 2]}
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 2}
+
+
+def test_oldest_entries_are_evicted_beyond_max_entries(tmp_path):
+    cache = SQLiteCache(
+        str(tmp_path / "cache.sqlite"), max_entries=10, eviction_interval=5
+    )
+    for i in range(14):
+        cache.set(("key", i), i)
+
+    # The entry count is only checked after every fifth written entry
+    assert len(cache) == 14
+    cache.set(("key", 14), 14)
+    assert len(cache) == 10
+    assert cache.get_many([("key", i) for i in range(15)]) == {
+        ("key", i): i for i in range(5, 15)
+    }
+
+
+def test_connection_is_reused_per_thread(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    connection = cache.get_connection()
+    cache.set(("key",), 1)
+    assert cache.get_connection() is connection
+
+    thread_connections = []
+
+    def read():
+        thread_connections.append(cache.get_connection())
+        assert cache.get(("key",)) == 1
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    assert len(thread_connections) == 1
+    assert thread_connections[0] is not connection
+
+
+# Caches created by the test before forking, as the module level caches of the solver
+caches = {}
+
+
+def write_entries(path, start):
+    caches[path].set_many({("key", i): i for i in range(start, start + 100)})
+    return len(caches[path])
+
+
+def test_forked_workers_share_the_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    caches[path] = SQLiteCache(path)
+    caches[path].set(("key", -1), -1)
+    with ProcessPoolExecutor(2, mp_context=get_context("fork")) as executor:
+        list(executor.map(write_entries, [path] * 4, range(0, 400, 100)))
+    assert len(caches.pop(path)) == 401
@@ -0,0 +1,31 @@
+import os
+from src.input.create_problems import generate_datasets, get_dataset_filename
+from src.input.ground_terminals import europe_ground_terminals
+
+
+def test_weather_is_prefetched_once_for_all_workers(weather_server, tmp_path):
+    server, url = weather_server()
+    ground_terminals = {
+        terminal: europe_ground_terminals[terminal]
+        for terminal in list(europe_ground_terminals)[:3]
+    }
+    config = {
+        "locations": "europe",
+        "ground_terminals": ground_terminals,
+        "planning_horizon": 24,
+        "number_app_contexts_per_node": 2,
+        "step_duration": 30,
+        "min_elevation_angle": 15,
+        "propagation_workers": 1,
+        "build_mps": False,
+        "output_base": str(tmp_path) + "/",
+        "cache_file": str(tmp_path / "satellite_passes_cache.sqlite"),
+        "weather_url": url,
+        "weather_cache_file": str(tmp_path / "weather_cache.sqlite"),
+    }
+    tasks = [(4, "train", 5), (4, "test", 15), (5, "train", 25)]
+    assert generate_datasets(tasks, config, workers=2) == []
+    assert all(os.path.exists(get_dataset_filename(task, config)) for task in tasks)
+
+    # One range request per location in the parent, the workers read the cache
+    assert server.request_count == len(ground_terminals)
@@ -0,0 +1,133 @@
+import json
+from collections import Counter
+import numpy as np
+import pytest
+from scipy import sparse
+from src.formulation import CONFLICT_FORMULATIONS, get_model_matrices
+from src.instance_format import read_problem_instance_arrays, save_problem_instance_npz
+from src.utils import verify_contacts_solution
+from tests.helpers import (
+    PROBLEM_INSTANCE,
+    get_highs_optimum,
+    get_inequality_rows,
+    get_random_problem_instance,
+)
+
+
+@pytest.mark.parametrize("conflict_formulation", CONFLICT_FORMULATIONS)
+def test_only_passes_of_the_same_satellite_conflict(conflict_formulation, tmp_path):
+    save_problem_instance_npz(PROBLEM_INSTANCE, tmp_path / "instance.npz")
+    columns = read_problem_instance_arrays(tmp_path / "instance.npz")
+    matrices = get_model_matrices(columns, conflict_formulation=conflict_formulation)
+
+    # One row holding the variables of passes 0 and 2
+    assert matrices["conflict_rows"].shape[0] == 1
+    conflict_passes = matrices["pass_index"][matrices["conflict_rows"].indices]
+    assert set(conflict_passes.tolist()) == {0, 2}
+
+    # Passes 0 and 1 (or 1 and 2) serve two QKD targets with key volume 1 each
+    optimum = get_highs_optimum(matrices["objective"], *get_inequality_rows(matrices))
+    assert np.isclose(optimum, 4)
+
+
+def test_contacts_of_different_satellites_may_overlap():
+    passes = PROBLEM_INSTANCE["satellite_passes"]
+    targets = PROBLEM_INSTANCE["service_targets"]
+    contacts = [
+        {"satellitePass": passes[0], "serviceTarget": targets[0]},
+        {"satellitePass": passes[1], "serviceTarget": targets[1]},
+    ]
+    assert verify_contacts_solution(contacts)
+    contacts[1] = {"satellitePass": passes[2], "serviceTarget": targets[1]}
+    assert not verify_contacts_solution(contacts)
+
+
+def test_clique_and_bigm_rows_have_the_same_optimum(tmp_path):
+    problem_instance = get_random_problem_instance(
+        10,
+        np.datetime64("2024-04-15T00:00:00"),
+        np.datetime64("2024-04-15T06:00:00"),
+        3,
+    )
+    save_problem_instance_npz(problem_instance, tmp_path / "instance.npz")
+    columns = read_problem_instance_arrays(tmp_path / "instance.npz")
+    optima = {}
+    for conflict_formulation in CONFLICT_FORMULATIONS:
+        matrices = get_model_matrices(
+            columns, conflict_formulation=conflict_formulation
+        )
+        optima[conflict_formulation] = get_highs_optimum(
+            matrices["objective"], *get_inequality_rows(matrices)
+        )
+    assert np.isclose(optima["clique"], optima["bigm"])
+
+    # The non-overlap rows cut off the optimum without them
+    rows = sparse.vstack([matrices["pass_rows"], matrices["target_rows"]])
+    assert (
+        get_highs_optimum(matrices["objective"], rows, np.ones(rows.shape[0]))
+        > optima["clique"]
+    )
+
+
+def get_loop_rows(model):
+    # Rows of a Gurobi model in "<=" form as (sorted (name, coefficient) pairs, rhs)
+    names = [var.VarName for var in model.getVars()]
+    rows = model.getA().tocsr()
+    for row, constraint in enumerate(model.getConstrs()):
+        sign = -1.0 if constraint.Sense == ">" else 1.0
+        start, end = rows.indptr[row], rows.indptr[row + 1]
+        yield tuple(
+            sorted(
+                (names[column], sign * coefficient)
+                for column, coefficient in zip(
+                    rows.indices[start:end], rows.data[start:end]
+                )
+            )
+        ), round(sign * constraint.RHS, 6)
+
+
+def get_matrix_rows(matrices):
+    rows, rhs = get_inequality_rows(matrices)
+    for row in range(rows.shape[0]):
+        start, end = rows.indptr[row], rows.indptr[row + 1]
+        yield tuple(
+            sorted(
+                (matrices["names"][column], coefficient)
+                for column, coefficient in zip(
+                    rows.indices[start:end], rows.data[start:end]
+                )
+            )
+        ), round(rhs[row], 6)
+
+
+@pytest.mark.parametrize("conflict_formulation", CONFLICT_FORMULATIONS)
+def test_matrices_match_the_loop_model(conflict_formulation, tmp_path):
+    pytest.importorskip("gurobipy")
+    from src.input.create_problems import build_model
+
+    problem_instance = json.loads(
+        json.dumps(
+            get_random_problem_instance(
+                6,
+                np.datetime64("2024-04-15T00:00:00"),
+                np.datetime64("2024-04-15T06:00:00"),
+                2,
+            ),
+            default=str,
+        )
+    )
+    save_problem_instance_npz(problem_instance, tmp_path / "instance.npz")
+    matrices = get_model_matrices(
+        read_problem_instance_arrays(tmp_path / "instance.npz"),
+        conflict_formulation=conflict_formulation,
+    )
+    model = build_model(problem_instance, conflict_formulation)
+    model.update()
+
+    objective = {var.VarName: var.Obj for var in model.getVars()}
+    assert objective.keys() == set(matrices["names"])
+    assert np.allclose(
+        [objective[name] for name in matrices["names"]], matrices["objective"]
+    )
+    assert matrices["conflict_rows"].shape[0] > 0
+    assert Counter(get_loop_rows(model)) == Counter(get_matrix_rows(matrices))
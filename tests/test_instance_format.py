@@ -0,0 +1,68 @@
+import json
+import numpy as np
+import pytest
+from src.input.create_problems import save_problem_instances_to_json
+from src.instance_format import (
+    PASS_COLUMNS,
+    TARGET_COLUMNS,
+    iter_problem_instance,
+    read_problem_instance_arrays,
+    read_problem_instance_records,
+    read_problem_instance_streaming,
+    save_problem_instance_npz,
+)
+from src.utils import read_problem_instance
+from tests.helpers import get_random_problem_instance
+
+
+@pytest.fixture
+def instance_files(tmp_path):
+    problem_instance = get_random_problem_instance(
+        10,
+        np.datetime64("2024-04-15T00:00:00"),
+        np.datetime64("2024-04-15T12:00:00"),
+        5,
+    )
+    json_file = str(tmp_path / "instance.json")
+    npz_file = str(tmp_path / "instance.npz")
+    save_problem_instances_to_json([problem_instance], json_file)
+    with open(json_file, "r") as f:
+        save_problem_instance_npz(json.load(f)[0], npz_file)
+    return json_file, npz_file
+
+
+def test_streamed_records_match_json_load(instance_files):
+    json_file, _ = instance_files
+    with open(json_file, "r") as f:
+        expected = json.load(f)[0]
+    assert read_problem_instance(json_file) == expected
+
+    # Values spanning many chunks are decoded the same
+    records = {"satellite_passes": [], "service_targets": []}
+    for field, value in iter_problem_instance(json_file, chunk_size=7):
+        if field in records:
+            records[field].append(value)
+    assert records["satellite_passes"] == expected["satellite_passes"]
+    assert records["service_targets"] == expected["service_targets"]
+
+
+def test_records_at_positions(instance_files):
+    json_file, _ = instance_files
+    expected = read_problem_instance(json_file)
+    satellite_passes, service_targets = read_problem_instance_records(
+        json_file, {0, 3, 7}, {1, 2}
+    )
+    assert satellite_passes == {i: expected["satellite_passes"][i] for i in (0, 3, 7)}
+    assert service_targets == {j: expected["service_targets"][j] for j in (1, 2)}
+
+
+def test_streamed_columns_match_npz(instance_files):
+    json_file, npz_file = instance_files
+    streamed = read_problem_instance_streaming(json_file)
+    stored = read_problem_instance_arrays(npz_file)
+    for field, columns in (
+        ("satellite_passes", PASS_COLUMNS),
+        ("service_targets", TARGET_COLUMNS),
+    ):
+        for key, _ in columns.values():
+            assert np.array_equal(streamed[field][key], stored[field][key])
@@ -0,0 +1,110 @@
+import random
+import numpy as np
+import pytest
+from scipy import sparse
+from src.formulation import get_model_matrices
+from src.instance_format import read_problem_instance_arrays, save_problem_instance_npz
+from src.presolve import presolve_problem_instance
+from src.utils import check_presolved_for_sequencing
+from tests.helpers import (
+    PROBLEM_INSTANCE,
+    get_highs_optimum,
+    get_inequality_rows,
+    get_random_problem_instance,
+)
+
+
+def get_problem_instance():
+    # Random instance whose applications have a QKD and a post-processing target,
+    # plus applications with a single post-processing target that no sequencing row
+    # refers to
+    random.seed(0)
+    problem_instance = get_random_problem_instance(
+        4,
+        np.datetime64("2024-04-15T00:00:00"),
+        np.datetime64("2024-04-15T12:00:00"),
+        5,
+    )
+    targets = problem_instance["service_targets"]
+    for node_id in range(4):
+        for _ in range(20):
+            targets.append(
+                {
+                    "id": len(targets),
+                    "applicationId": len(targets),
+                    "priority": round(random.uniform(0.01, 1.0), 2),
+                    "nodeId": node_id,
+                    "requestedOperation": "OPTICAL_ONLY",
+                }
+            )
+    return problem_instance
+
+
+def get_optimum(problem_instance, tmp_path, sequencing):
+    # HiGHS optimum of the model, with the QKD before post-processing rows of
+    # src/solvers/gurobi_solver.py if sequencing is set
+    save_problem_instance_npz(problem_instance, tmp_path / "instance.npz")
+    columns = read_problem_instance_arrays(tmp_path / "instance.npz")
+    matrices = get_model_matrices(columns, conflict_formulation="clique")
+    rows, rhs = get_inequality_rows(matrices)
+
+    if sequencing:
+        passes = columns["satellite_passes"]
+        targets = columns["service_targets"]
+        reference_time = np.datetime64(columns["coverage_start"], "s").astype(np.int64)
+        ti = (np.asarray(passes["startTime"]) - reference_time).astype(float)
+        qkd = np.asarray(targets["requestedOperation"]) == 0
+        applications = np.asarray(targets["applicationId"])
+        # Start time of the assigned pass, summed over the variables of a target
+        start_times = sparse.csr_matrix(
+            (
+                ti[matrices["pass_index"]],
+                (matrices["target_index"], np.arange(len(matrices["pass_index"]))),
+            ),
+            shape=(len(applications), len(matrices["pass_index"])),
+        )
+        sequencing_rows = [
+            start_times[j1] - start_times[j2]
+            for j1 in np.flatnonzero(qkd)
+            for j2 in np.flatnonzero(~qkd & (applications == applications[j1]))
+        ]
+        rows = sparse.vstack([rows] + sequencing_rows).tocsr()
+        rhs = np.concatenate([rhs, np.zeros(len(sequencing_rows))])
+
+    return get_highs_optimum(matrices["objective"], rows, rhs)
+
+
+@pytest.mark.parametrize("sequencing", [False, True])
+def test_presolve_keeps_the_optimum(sequencing, tmp_path):
+    problem_instance = get_problem_instance()
+    reduced_instance, kept = presolve_problem_instance(
+        problem_instance, sequencing=sequencing
+    )
+    assert len(kept) < len(problem_instance["service_targets"])
+    assert np.isclose(
+        get_optimum(reduced_instance, tmp_path, sequencing),
+        get_optimum(problem_instance, tmp_path, sequencing),
+    )
+
+
+def test_solvers_with_sequencing_rows_refuse_other_presolved_instances(tmp_path):
+    # Dropping post-processing targets lifts the sequencing rows of their QKD targets
+    problem_instance = get_problem_instance()
+    assert get_optimum(
+        presolve_problem_instance(problem_instance)[0], tmp_path, True
+    ) > get_optimum(problem_instance, tmp_path, True)
+
+    check_presolved_for_sequencing(problem_instance)
+    check_presolved_for_sequencing(
+        presolve_problem_instance(problem_instance, sequencing=True)[0]
+    )
+    with pytest.raises(Exception, match="presolved without"):
+        check_presolved_for_sequencing(presolve_problem_instance(problem_instance)[0])
+
+
+def test_passes_of_different_satellites_add_up():
+    # Node 1 has two overlapping passes of different satellites, both of its targets
+    # can be served
+    reduced_instance, kept = presolve_problem_instance(PROBLEM_INSTANCE)
+    assert kept == [0, 1, 2]
+    assert reduced_instance["presolved"]
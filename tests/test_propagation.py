@@ -0,0 +1,253 @@
+import numpy as np
+import pytest
+from sgp4.api import Satrec
+from src.input.ground_terminals import europe_ground_terminals
+from src.input.propagation import (
+    find_visibility_windows,
+    get_grouped_visible_samples,
+    get_interpolated_propagator,
+    get_terminal_geometry,
+    make_sgp4_propagator,
+    process_pools,
+)
+from src.input.quarc_data_generation import (
+    calculate_satellite_passes,
+    get_constellation_propagator,
+    get_propagator,
+    get_quarc_satellite_passes,
+    get_satellite,
+    get_time_chunks,
+    tle_lines,
+)
+
+START_TIME = np.datetime64("2024-04-15T00:00:00")
+GROUND_TERMINALS = {
+    terminal: europe_ground_terminals[terminal]
+    for terminal in list(europe_ground_terminals)[:20]
+}
+# The satellite is seen on most orbits from polar terminals
+HIGH_LATITUDE_TERMINALS = {
+    "Svalbard": {"lat": 78.23, "lon": 15.39, "alt": 500},
+    "North Pole": {"lat": 89.9, "lon": 0.0, "alt": 0},
+    "McMurdo": {"lat": -77.85, "lon": 166.67, "alt": 10},
+}
+
+
+def test_interpolated_windows_match_direct_propagation():
+    duration = 12 * 3600.0
+    terminal_xyz, terminal_up = get_terminal_geometry(GROUND_TERMINALS)
+    propagate = get_propagator(get_satellite(*tle_lines), START_TIME)
+    direct = find_visibility_windows(propagate, terminal_xyz, terminal_up, duration, 15)
+    interpolated = find_visibility_windows(
+        get_interpolated_propagator(propagate, duration),
+        terminal_xyz,
+        terminal_up,
+        duration,
+        15,
+    )
+    assert np.array_equal(direct[0], interpolated[0])
+    assert np.max(np.abs(direct[1] - interpolated[1])) < 0.05
+    assert np.max(np.abs(direct[2] - interpolated[2])) < 0.05
+
+
+def test_elevation_engines_give_the_same_passes():
+    ground_terminals = dict(list(GROUND_TERMINALS.items())[:4])
+    ground_terminals.update(HIGH_LATITUDE_TERMINALS)
+    passes = {
+        engine: calculate_satellite_passes(
+            [get_satellite(*tle_lines)],
+            ground_terminals,
+            START_TIME,
+            START_TIME + np.timedelta64(12, "h"),
+            30,
+            15,
+            engine=engine,
+        )
+        for engine in ("loop", "vectorized", "batched")
+    }
+    assert len(passes["loop"]) > 0
+    for engine in ("vectorized", "batched"):
+        assert passes[engine][["Station", "Satellite", "Start", "End"]].equals(
+            passes["loop"][["Station", "Satellite", "Start", "End"]]
+        )
+        assert np.allclose(
+            passes[engine]["Key Volume"], passes["loop"]["Key Volume"], rtol=1e-9
+        )
+
+
+def test_refined_passes_match_sampled_passes():
+    step_duration = 5
+    passes = {
+        pass_detection: calculate_satellite_passes(
+            [get_satellite(*tle_lines)],
+            GROUND_TERMINALS,
+            START_TIME,
+            START_TIME + np.timedelta64(24, "h"),
+            step_duration,
+            15,
+            pass_detection=pass_detection,
+        )
+        .sort_values(["Station", "Start"])
+        .reset_index(drop=True)
+        for pass_detection in ("sampled", "refined")
+    }
+    sampled, refined = passes["sampled"], passes["refined"]
+    assert len(sampled) > 0
+    assert sampled["Station"].equals(refined["Station"])
+
+    # Refined boundaries lie at most one sampling step outside the sampled ones
+    start_shifts = (
+        sampled["Start"].to_numpy(dtype="datetime64[s]")
+        - refined["Start"].to_numpy(dtype="datetime64[s]")
+    ) / np.timedelta64(1, "s")
+    end_shifts = (
+        refined["End"].to_numpy(dtype="datetime64[s]")
+        - sampled["End"].to_numpy(dtype="datetime64[s]")
+    ) / np.timedelta64(1, "s")
+    assert np.all((start_shifts >= 0) & (start_shifts <= step_duration))
+    assert np.all((end_shifts >= 0) & (end_shifts <= step_duration))
+
+    # The quadrature and the sum over samples integrate the same key rate
+    assert np.isclose(
+        refined["Key Volume"].sum(), sampled["Key Volume"].sum(), rtol=1e-3
+    )
+
+
+def get_elevation_angles(propagate, offsets):
+    # Elevation angles (deg) of the satellite above every terminal, shape (N, M)
+    terminal_xyz, terminal_up = get_terminal_geometry(GROUND_TERMINALS)
+    relative = propagate(offsets)[:, None, :] - terminal_xyz[:, :, None]
+    heights = np.einsum("kn,knm->nm", terminal_up, relative)
+    return np.degrees(np.arcsin(heights / np.linalg.norm(relative, axis=0)))
+
+
+@pytest.mark.parametrize(
+    "start_time", [START_TIME, np.datetime64("2024-04-15T00:00:00.250")]
+)
+def test_sgp4_backend_matches_skyfield(start_time):
+    offsets = np.arange(0, 24 * 3600, 30.0)
+    elevations = {
+        backend: get_elevation_angles(
+            get_propagator(get_satellite(*tle_lines), start_time, backend), offsets
+        )
+        for backend in ("skyfield", "sgp4")
+    }
+    assert np.max(np.abs(elevations["skyfield"] - elevations["sgp4"])) < 1e-3
+
+
+@pytest.mark.parametrize("backend", ["skyfield", "sgp4"])
+def test_fractional_start_seconds_are_kept(backend):
+    offsets = np.arange(0, 3600, 60.0)
+    satellite = get_satellite(*tle_lines)
+    shifted = get_propagator(
+        satellite, np.datetime64("2024-04-15T00:00:00.250"), backend
+    )
+    whole = get_propagator(satellite, START_TIME, backend)
+    assert np.allclose(shifted(offsets), whole(offsets + 0.25), rtol=0, atol=1e-6)
+
+
+def test_sgp4_errors_raise():
+    # An eccentricity of 0.9999999 puts the orbit inside the Earth
+    line2 = tle_lines[1][:26] + "9999999" + tle_lines[1][33:]
+    propagate = make_sgp4_propagator(
+        [Satrec.twoline2rv(tle_lines[0], line2)], START_TIME
+    )
+    with pytest.raises(ValueError, match="SGP4 failed for satellite 35683"):
+        propagate(np.arange(0, 600, 60.0))
+
+
+@pytest.mark.parametrize("prefilter_stride", [6, 30])
+@pytest.mark.parametrize("min_elevation_angle", [0, 15, "edge"])
+def test_prefilter_keeps_all_visible_samples(min_elevation_angle, prefilter_stride):
+    satellite_xyz = get_constellation_propagator(
+        [get_satellite(*tle_lines)], START_TIME
+    )(np.arange(0, 24 * 3600, 10.0))
+    terminal_xyz, terminal_up = get_terminal_geometry(
+        {**GROUND_TERMINALS, **HIGH_LATITUDE_TERMINALS}
+    )
+    if min_elevation_angle == "edge":
+        # Mask at the elevation of a sample of the polar terminals, exactly on the edge
+        terminals, _, _, elevations, _ = get_grouped_visible_samples(
+            satellite_xyz, terminal_xyz, terminal_up, 15
+        )
+        min_elevation_angle = elevations[terminals >= len(GROUND_TERMINALS)].min()
+
+    unfiltered = get_grouped_visible_samples(
+        satellite_xyz, terminal_xyz, terminal_up, min_elevation_angle
+    )
+    prefiltered = get_grouped_visible_samples(
+        satellite_xyz,
+        terminal_xyz,
+        terminal_up,
+        min_elevation_angle,
+        prefilter_stride=prefilter_stride,
+    )
+    assert np.any(unfiltered[0] >= len(GROUND_TERMINALS))
+    for unfiltered_samples, prefiltered_samples in zip(unfiltered[:4], prefiltered[:4]):
+        assert np.array_equal(unfiltered_samples, prefiltered_samples)
+    assert prefiltered[4] < unfiltered[4]
+
+
+def test_worker_processes_give_the_same_passes(weather_server, tmp_path):
+    server, url = weather_server()
+    passes = [
+        get_quarc_satellite_passes(
+            GROUND_TERMINALS,
+            START_TIME,
+            START_TIME + np.timedelta64(12, "h"),
+            10,
+            15,
+            workers=workers,
+            cache_file=str(tmp_path / f"passes_{workers}.sqlite"),
+            weather_url=url,
+            weather_cache_file=str(tmp_path / "weather_cache.sqlite"),
+        )
+        for workers in (1, 2)
+    ]
+    assert len(passes[0]) > 0
+    assert passes[0] == passes[1]
+
+    # The pool of the call is shut down when it returns
+    assert process_pools == {}
+
+
+@pytest.mark.parametrize(
+    "start_time",
+    [np.datetime64("2024-04-15T00:00:03"), np.datetime64("2024-04-15T03:00:00.250")],
+)
+def test_chunks_match_the_whole_window(start_time, weather_server, tmp_path):
+    # Starts off the step and with fractional seconds, chunks of one hour against a
+    # single chunk
+    server, url = weather_server()
+    end_time = np.datetime64("2024-04-16T00:00:00")
+    assert len(get_time_chunks(start_time, end_time, 10, 3600)) > 1
+    assert len(get_time_chunks(start_time, end_time, 10, 10**9)) == 1
+    passes = [
+        get_quarc_satellite_passes(
+            GROUND_TERMINALS,
+            start_time,
+            end_time,
+            10,
+            15,
+            cache_file=str(tmp_path / f"passes_{chunk_duration}.sqlite"),
+            chunk_duration=chunk_duration,
+            weather_url=url,
+            weather_cache_file=str(tmp_path / "weather_cache.sqlite"),
+        )
+        for chunk_duration in (3600, 10**9)
+    ]
+    assert len(passes[0]) == len(passes[1]) > 0
+    for chunked, whole in zip(*passes):
+        assert chunked.pop("achievableKeyVolume") == pytest.approx(
+            whole.pop("achievableKeyVolume"), rel=1e-9
+        )
+        assert chunked == whole
+
+
+def test_chunk_borders_lie_on_the_sampling_grid():
+    start_time = np.datetime64("2024-04-15T03:00:00.250")
+    chunks = get_time_chunks(start_time, np.datetime64("2024-04-16T00:00:00"), 7)
+    for chunk_start, _ in chunks:
+        offset = (chunk_start - start_time) / np.timedelta64(1, "s")
+        assert offset % 7 == 0
+    assert chunks[0][0] == start_time
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# Cumulative import time budget in seconds per module, as reported by -X importtime.
+# Solver scripts import src.utils, the generator imports the input modules
+IMPORT_TIME_BUDGETS = {
+    "src.utils": 0.1,
+    "src.input.weather": 0.4,
+    "src.input.quarc_data_generation": 1.0,
+}
+
+# The modules are imported as src.* from the repository root
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_import_time(module, repeats=5):
+    # Smallest cumulative import time in seconds over fresh interpreters
+    import_times = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=REPOSITORY_ROOT,
+        )
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if line.startswith("import time:") and fields[-1].strip() == module:
+                import_times.append(int(fields[1]) / 1e6)
+    return min(import_times)
+
+
+@pytest.mark.parametrize("module", IMPORT_TIME_BUDGETS)
+def test_import_time_within_budget(module):
+    assert get_import_time(module) <= IMPORT_TIME_BUDGETS[module]
+
+
+def test_nothing_initialized_at_import():
+    # Importing the generator in a fresh interpreter creates neither the timescale,
+    # the satellites nor an HTTP session and does not pull in matplotlib
+    lazy_check = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from src.input import quarc_data_generation, weather\n"
+            "print(quarc_data_generation.get_timescale.cache_info().currsize\n"
+            "    + quarc_data_generation.get_satellite.cache_info().currsize\n"
+            "    + len(weather.http_sessions), 'matplotlib' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPOSITORY_ROOT,
+    ).stdout.split()
+    assert lazy_check == ["0", "False"]
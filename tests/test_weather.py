@@ -0,0 +1,82 @@
+import numpy as np
+from src.input.ground_terminals import europe_ground_terminals
+from src.input.weather import (
+    get_cloud_coverage,
+    get_daily_weather_records,
+    get_weather_records,
+    prefetch_weather,
+    request_weather_range,
+)
+
+DATES = [
+    str(date) for date in np.arange("2024-04-15", "2024-04-22", dtype="datetime64[D]")
+]
+LOCATIONS = [
+    (position["lat"], position["lon"])
+    for position in list(europe_ground_terminals.values())[:5]
+]
+
+
+def test_range_fetch_answers_single_day_lookups(weather_server, tmp_path):
+    server, url = weather_server()
+    cache_file = str(tmp_path / "weather_cache.sqlite")
+
+    coverage = {
+        location: get_cloud_coverage(*location, DATES, url, cache_file)
+        for location in LOCATIONS
+    }
+    assert server.request_count == len(LOCATIONS)
+
+    # Later single-day lookups are answered from the cached ranges
+    server.request_count = 0
+    for location in LOCATIONS:
+        for date in DATES:
+            record = get_weather_records(*location, [date], url, cache_file)[date]
+            assert record["cloud_coverage_fraction"] == coverage[location][date]
+    assert server.request_count == 0
+
+    # The range matches one request per day
+    for location in LOCATIONS:
+        for date in DATES:
+            data = request_weather_range(*location, date, date, url)
+            records = get_daily_weather_records(*location, data)
+            assert np.isclose(
+                records[date]["cloud_coverage_fraction"], coverage[location][date]
+            )
+
+
+def test_prefetch_matches_serial_retrieval_under_rate_limit(weather_server, tmp_path):
+    coverage = {}
+    for name in ("serial", "prefetch"):
+        server, url = weather_server(latency=0.05, requests_per_second=2)
+        cache_file = str(tmp_path / f"{name}.sqlite")
+        if name == "serial":
+            for location in LOCATIONS:
+                get_weather_records(*location, DATES, url, cache_file)
+        else:
+            # Far above the server limit, so the prefetch has to back off on 429
+            fetched = prefetch_weather(
+                {location: DATES for location in LOCATIONS},
+                url,
+                cache_file,
+                requests_per_minute=6000,
+            )
+            assert fetched == len(LOCATIONS)
+            assert server.rate_limited_count > 0
+
+        # Cloud coverage is read from the warm cache without further requests
+        request_count = server.request_count
+        coverage[name] = [
+            get_cloud_coverage(*location, DATES, url, cache_file)
+            for location in LOCATIONS
+        ]
+        assert server.request_count == request_count
+    assert coverage["prefetch"] == coverage["serial"]
+    assert (
+        prefetch_weather(
+            {location: DATES for location in LOCATIONS},
+            url,
+            str(tmp_path / "prefetch.sqlite"),
+        )
+        == 0
+    )